@@ -0,0 +1,7 @@
+""" Runs the benchmarks, kept for compatibility; see python -m networkmodel.benchmark """
+import sys
+
+from networkmodel.benchmark import main
+
+if __name__ == '__main__':
+    sys.exit(main())
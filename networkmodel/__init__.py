@@ -0,0 +1,11 @@
+""" Mendoza ODE model of regulatory networks
+
+Modules are imported on demand, so importing the package is cheap:
+
+    from networkmodel.network import load_network
+    from networkmodel.mendoza import CompiledNetwork
+    from networkmodel.steadystate import steady_state
+
+The command line interface is `python -m networkmodel` (see networkmodel.cli).
+"""
+__version__ = '0.1.0'
@@ -0,0 +1,204 @@
+""" Attractor deduplication and basin-of-attraction mapping
+
+Averaging the final states of a multistable network describes a state no
+sample ever reaches. Here final states are clustered into distinct
+steady states with a KD-tree index (two states are the same attractor when
+they differ by less than tol in every node), basin fractions are updated
+as batches of samples stream in, and trajectories are integrated in
+doubling time segments so that a sample which enters the capture radius of
+a known stable attractor is assigned to it without integrating it further.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.stats import norm
+
+from .ensemble import integrate_ensemble
+from .sampling import InitialConditionSampler
+
+BasinResult = namedtuple('BasinResult', ['attractors', 'counts', 'fractions', 'fraction_halfwidths',
+                                         'max_eigenvalues', 'mean_settle_time', 'n_samples', 'n_unsettled',
+                                         'n_captured', 'converged'])
+
+class AttractorIndex:
+    """ Distinct steady states, found by a max-norm KD-tree query within tol
+
+    Every attractor keeps the first state that registered it and the
+    largest real part of the Jacobian's eigenvalues there (clamped nodes
+    excluded), so lookups can be restricted to stable attractors.
+    """
+
+    def __init__(self, network, tol=1e-3):
+        self.network = network
+        self.tol = tol
+        self.states = np.empty((0, network.num_of_nodes))
+        self.max_eigenvalues = np.empty(0)
+        self._tree = None
+        self._stable_tree = None
+        self._stable = np.empty(0, dtype=int)
+
+    def __len__(self):
+        return len(self.states)
+
+    def lookup(self, x, radius=None, stable_only=False):
+        """ Attractor of every row of x within radius (default tol), -1 where there is none """
+        x = np.atleast_2d(x)
+        tree = self._stable_tree if stable_only else self._tree
+        if tree is None:
+            return np.full(len(x), -1)
+        distance, index = tree.query(x, distance_upper_bound=self.tol if radius is None else radius, p=np.inf)
+        found = np.isfinite(distance)
+        if stable_only:
+            return np.where(found, self._stable[np.minimum(index, len(self._stable) - 1)], -1)
+        return np.where(found, index, -1)
+
+    def add(self, x):
+        """ Attractor of every row of x, registering the rows that match no known attractor """
+        x = np.atleast_2d(x)
+        labels = self.lookup(x)
+        new = np.flatnonzero(labels < 0)
+        if not len(new):
+            return labels
+
+        # Group the new states among themselves before they enter the tree
+        centres = []
+        for i in new:
+            if labels[i] >= 0:
+                continue
+            label = len(self.states) + len(centres)
+            centres.append(x[i])
+            rest = new[labels[new] < 0]
+            labels[rest[np.max(np.abs(x[rest] - x[i]), axis=1) < self.tol]] = label
+        self._register(np.array(centres))
+        return labels
+
+    def _register(self, centres):
+        network = self.network
+        jac = network.jacobian(centres)
+        if not isinstance(jac, np.ndarray):
+            jac = np.stack([network.jacobian(x).toarray() for x in centres])
+        # Clamped rows are zero; -1 on their diagonal keeps them out of the maximum
+        diag = np.arange(network.num_of_nodes)
+        jac[:, diag, diag] -= 1 - network.free
+        eigenvalues = np.max(np.linalg.eigvals(jac).real, axis=1)
+
+        self.states = np.vstack((self.states, centres))
+        self.max_eigenvalues = np.concatenate((self.max_eigenvalues, eigenvalues))
+        self._tree = cKDTree(self.states)
+        self._stable = np.flatnonzero(self.max_eigenvalues < 0)
+        self._stable_tree = cKDTree(self.states[self._stable]) if len(self._stable) else None
+
+class BasinMapper:
+    """ Streams batches of initial conditions into basin counts of an AttractorIndex
+
+    Each batch is integrated over segments of t_first, 2 t_first, 4 t_first,
+    ... up to t_max. After every segment a sample whose max norm of f is
+    below steady_state_tol has settled and is added to the index, and a
+    sample within capture_radius of a known stable attractor is assigned
+    to it and stops. Samples still moving at t_max (e.g. on a limit cycle)
+    are counted as unsettled. capture_radius must lie well inside the basins
+    of the stable attractors; the default suits sigmoids of steepness h ~ 10.
+    The network needs a single row of clamps.
+    """
+
+    def __init__(self, network, tol=1e-3, capture_radius=0.02, t_first=1.0, t_max=1000, steady_state_tol=1e-6):
+        self.network = network
+        self.index = AttractorIndex(network, tol)
+        self.capture_radius = capture_radius
+        self.t_first = t_first
+        self.t_max = t_max
+        self.steady_state_tol = steady_state_tol
+        self.counts = np.zeros(0, dtype=int)
+        self.settle_time = np.zeros(0)
+        self.n_samples = 0
+        self.n_unsettled = 0
+        self.n_captured = 0
+
+    def add_batch(self, xinit):
+        """ Attractor label of every row of xinit (-1 for samples that did not settle by t_max) """
+        network = self.network
+        x = np.atleast_2d(np.asarray(xinit, dtype=float)).copy()
+        labels = np.full(len(x), -1)
+        times = np.zeros(len(x))
+        active = np.arange(len(x))
+        t = 0.0
+        segment = self.t_first
+        while len(active) and t < self.t_max:
+            segment = min(segment, self.t_max - t)
+            x[active] = integrate_ensemble(network, x[active], segment)
+            t += segment
+            segment *= 2
+            times[active] = t
+
+            settled = np.max(np.abs(network.rhs(x[active])), axis=1) < self.steady_state_tol
+            if np.any(settled):
+                labels[active[settled]] = self.index.add(x[active[settled]])
+            moving = active[~settled]
+            captured = self.index.lookup(x[moving], self.capture_radius, stable_only=True)
+            labels[moving] = captured
+            self.n_captured += int(np.sum(captured >= 0))
+            active = moving[captured < 0]
+
+        n_attractors = len(self.index)
+        self.counts = np.concatenate((self.counts, np.zeros(n_attractors - len(self.counts), dtype=int)))
+        self.settle_time = np.concatenate((self.settle_time, np.zeros(n_attractors - len(self.settle_time))))
+        found = labels >= 0
+        np.add.at(self.counts, labels[found], 1)
+        np.add.at(self.settle_time, labels[found], times[found])
+        self.n_samples += len(x)
+        self.n_unsettled += len(x) - int(np.sum(found))
+        return labels
+
+    def fractions(self, confidence=0.95):
+        """ Basin fractions of every attractor and the half-widths of their Wilson score intervals """
+        z = norm.ppf(0.5 + confidence / 2)
+        n = max(self.n_samples, 1)
+        p = self.counts / n
+        centre = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+        halfwidth = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+        # The interval is not centred on p; its larger distance from p is reported
+        return p, np.maximum(centre + halfwidth - p, p - centre + halfwidth)
+
+    def result(self, confidence=0.95, tol=None):
+        """ BasinResult of the samples so far; converged when every half-width is below tol """
+        fractions, halfwidths = self.fractions(confidence)
+        mean_settle_time = self.settle_time / np.maximum(self.counts, 1)
+        converged = tol is not None and bool(np.all(halfwidths < tol))
+        return BasinResult(self.index.states, self.counts, fractions, halfwidths, self.index.max_eigenvalues,
+                           mean_settle_time, self.n_samples, self.n_unsettled, self.n_captured, converged)
+
+def basin_analysis(network, tol=1e-2, confidence=0.95, sampler='sobol', seed=None, batch_size=256,
+                   min_samples=256, max_samples=10000, state_tol=1e-3, capture_radius=0.02, t_max=1000,
+                   steady_state_tol=1e-6):
+    """ Attractors of the network and their basin fractions, sampled until the fractions are known to +-tol
+
+    Batches of initial conditions (clamped nodes start at 1) are streamed
+    through a BasinMapper until the confidence interval of every basin
+    fraction is narrower than +-tol, or max_samples. As in
+    adaptive_ensemble, Sobol batches are powers of two, so sampling stops at
+    the largest power of two within max_samples. Returns a BasinResult with
+    the distinct attractors (n_attractors, n_nodes), their sample counts,
+    fractions and interval half-widths, the largest real part of their
+    Jacobian eigenvalues, the mean time the samples took to reach them, and
+    how many samples were captured early or never settled.
+    """
+    if min_samples < 1 or max_samples < min_samples:
+        raise ValueError(f'Need 1 <= min_samples <= max_samples, got {min_samples} and {max_samples}')
+    clamped = network.clamped if np.any(network.clamped) else None
+    draw = InitialConditionSampler(network.num_of_nodes, sampler, seed, clamped).draw
+    mapper = BasinMapper(network, state_tol, capture_radius, t_max=t_max, steady_state_tol=steady_state_tol)
+
+    if sampler == 'sobol':
+        # Powers of two only: min_samples rounded up, max_samples rounded down
+        max_samples = 1 << (int(max_samples).bit_length() - 1)
+        min_samples = min(1 << (int(min_samples) - 1).bit_length(), max_samples)
+
+    n_next = min_samples
+    while mapper.n_samples + n_next <= max_samples or (sampler != 'sobol' and mapper.n_samples < max_samples):
+        mapper.add_batch(draw(min(n_next, max_samples - mapper.n_samples)))
+        result = mapper.result(confidence, tol)
+        if result.converged:
+            return result
+        n_next = mapper.n_samples if sampler == 'sobol' else batch_size
+    return mapper.result(confidence, tol)
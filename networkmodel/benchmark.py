@@ -0,0 +1,175 @@
+""" Benchmarks of the loader, right-hand side, ensemble, SBML export and RoadRunner paths
+
+Runs headless and writes machine-readable JSON:
+
+    python -m networkmodel.benchmark run --output bench.json
+    python -m networkmodel.benchmark compare old.json new.json --threshold 0.2
+
+compare exits with status 1 if any benchmark got slower by more than the
+threshold (as a fraction of the old time).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+from scipy.integrate import odeint
+
+from .ensemble import integrate_ensemble, random_initial_conditions
+from .mendoza import CompiledNetwork, odesysfun
+from .network import load_network
+from .synthetic import scale_free_network
+
+NETWORK_FILE = 'SMENR1.xlsx'
+SYNTHETIC_SIZES = (32, 128, 512, 1000, 5000)
+
+def time_function(function, repeats=5, number=1):
+    """ Best and median wall time per call over repeats of number calls """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {'best': min(times), 'median': float(np.median(times)), 'repeats': repeats, 'number': number}
+
+def _record(results, name, function, **kwargs):
+    try:
+        results[name] = time_function(function, **kwargs)
+    except ImportError as e:
+        results[name] = {'skipped': f'missing dependency: {e.name}'}
+    print(f"{name:<40} {_format(results[name])}", flush=True)
+
+def _format(result):
+    if 'skipped' in result:
+        return result['skipped']
+    return f"{result['best'] * 1e3:12.3f} ms (median {result['median'] * 1e3:.3f} ms)"
+
+def shipped_benchmarks(results, network_file=NETWORK_FILE, n_samples=100):
+    mact, minh, node_names, num_of_nodes, _ = load_network(network_file)
+    gamma = np.ones(num_of_nodes)
+    h = 10
+    clamped = np.zeros(num_of_nodes)
+    network = CompiledNetwork(mact, minh, gamma, h, clamped)
+    x = np.random.default_rng(0).random(num_of_nodes)
+    xinit = random_initial_conditions(n_samples, num_of_nodes, seed=0)
+    t = np.linspace(0, 30, 100)
+
+    _record(results, 'loader/parse_xlsx', lambda: load_network(network_file, use_cache=False), repeats=3)
+    _record(results, 'loader/cached', lambda: load_network(network_file), repeats=5)
+    _record(results, 'rhs/odesysfun', lambda: odesysfun(x, 0, num_of_nodes, gamma, h, mact, minh, clamped),
+            number=100)
+    _record(results, 'rhs/compiled', lambda: network.rhs(x), number=1000)
+    _record(results, 'jacobian/compiled', lambda: network.jacobian(x), number=1000)
+    _record(results, f'baseline/odeint_loop_{n_samples}',
+            lambda: [odeint(network.rhs, x0, t)[-1] for x0 in xinit], repeats=3)
+    _record(results, f'baseline/ensemble_{n_samples}', lambda: integrate_ensemble(network, xinit, 30), repeats=3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sbml_file = os.path.join(tmp, 'model.xml')
+
+        def export(mode):
+            from .sbmlgenerator import export_to_sbml_with_params
+            export_to_sbml_with_params(sbml_file, node_names, mact, minh, x, clamped, 1.0, 10.0, mode=mode)
+
+        def quiet(function):
+            # libsbml's consistency report goes to stdout
+            def run():
+                stdout = sys.stdout
+                sys.stdout = open(os.devnull, 'w')
+                try:
+                    function()
+                finally:
+                    sys.stdout.close()
+                    sys.stdout = stdout
+            return run
+
+        _record(results, 'sbml/export_reactions', quiet(lambda: export('reactions')), repeats=3)
+        _record(results, 'sbml/export_rate_rules', quiet(lambda: export('rate_rules')), repeats=3)
+
+        def roadrunner_simulate():
+            import roadrunner
+            rr = roadrunner.RoadRunner(sbml_file)
+            rr.simulate(0, 30, 100)
+
+        def ensemble_simulate():
+            from .rrensemble import RoadRunnerEnsemble
+            RoadRunnerEnsemble(sbml_file).run(xinit)
+
+        _record(results, 'roadrunner/load_and_simulate', roadrunner_simulate, repeats=3)
+        _record(results, f'roadrunner/ensemble_{n_samples}', ensemble_simulate, repeats=3)
+
+def synthetic_benchmarks(results, sizes=SYNTHETIC_SIZES, n_samples=10):
+    for num_of_nodes in sizes:
+        mact, minh, _ = scale_free_network(num_of_nodes, seed=0)
+        network = CompiledNetwork(mact, minh, np.ones(num_of_nodes), 10)
+        x = np.random.default_rng(0).random(num_of_nodes)
+        xinit = random_initial_conditions(n_samples, num_of_nodes, seed=0)
+        _record(results, f'synthetic_{num_of_nodes}/rhs', lambda: network.rhs(x), number=100)
+        _record(results, f'synthetic_{num_of_nodes}/jacobian', lambda: network.jacobian(x), number=100)
+        _record(results, f'synthetic_{num_of_nodes}/ensemble_{n_samples}',
+                lambda: integrate_ensemble(network, xinit, 30), repeats=1)
+
+def run(output, sizes=SYNTHETIC_SIZES, network_file=NETWORK_FILE):
+    results = {}
+    shipped_benchmarks(results, network_file)
+    synthetic_benchmarks(results, sizes)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'benchmarks': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Benchmark results saved to {output}')
+    return report
+
+def compare(old_file, new_file, threshold=0.2):
+    """ Print the change of every benchmark present in both files; returns the names of regressions """
+    with open(old_file) as f:
+        old = json.load(f)['benchmarks']
+    with open(new_file) as f:
+        new = json.load(f)['benchmarks']
+
+    regressions = []
+    print(f"{'benchmark':<40} {'old [ms]':>12} {'new [ms]':>12} {'change':>8}")
+    for name in sorted(set(old) & set(new)):
+        if 'best' not in old[name] or 'best' not in new[name]:
+            continue
+        change = new[name]['best'] / old[name]['best'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<40} {old[name]['best'] * 1e3:>12.3f} {new[name]['best'] * 1e3:>12.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run the benchmarks and write JSON')
+    run_parser.add_argument('--output', default='bench.json')
+    run_parser.add_argument('--network', default=NETWORK_FILE)
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(SYNTHETIC_SIZES))
+    compare_parser = subparsers.add_parser('compare', help='compare two benchmark JSON files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args.output, args.sizes, args.network)
+        return 0
+    return 1 if compare(args.old, args.new, args.threshold) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import copy
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+Attractor = namedtuple('Attractor', ['states', 'basin_size'])
+BooleanScreenResult = namedtuple('BooleanScreenResult', ['perturbations', 'baseline', 'deltas', 'order'])
+
+EXHAUSTIVE_LIMIT = 24
+ASYNC_LIMIT = 16
+BLOCK_SIZE = 1 << 20
+
+def pack_states(x, threshold=0.5):
+    """ Pack states (n_nodes,) or (n_states, n_nodes) into uint64 integers, bit i set if x_i > threshold """
+    x = np.atleast_2d(np.asarray(x)) > threshold
+    weights = np.left_shift(np.uint64(1), np.arange(x.shape[1], dtype=np.uint64))
+    return (x * weights).sum(axis=1, dtype=np.uint64)
+
+def unpack_states(states, num_of_nodes):
+    """ 0/1 float array (n_states, n_nodes) of packed states """
+    states = np.asarray(states, dtype=np.uint64)
+    bits = np.right_shift(states[:, None], np.arange(num_of_nodes, dtype=np.uint64)) & np.uint64(1)
+    return bits.astype(float)
+
+class BooleanNetwork:
+    """ Boolean limit (h -> infinity) of the Mendoza network on bit-packed states
+
+    Bit i of a uint64 state is node i. With 0/1 inputs the aggregated input w
+    of a node exceeds 1/2 exactly when the node has a regulator, at least one
+    activator is on (or it has no activators) and no inhibitor is on, so that
+    is the update rule. Clamps hold nodes at 0 or 1; clamps is a sequence of
+    (node, level) pairs as produced by perturbations.enumerate_perturbations.
+    Every update acts on a whole array of states at once.
+    """
+
+    def __init__(self, mact, minh, clamps=()):
+        mact = mact.toarray() if sp.issparse(mact) else np.asarray(mact)
+        minh = minh.toarray() if sp.issparse(minh) else np.asarray(minh)
+        self.num_of_nodes = mact.shape[0]
+        if self.num_of_nodes > 64:
+            raise ValueError(f"Packed states hold at most 64 nodes, the network has {self.num_of_nodes}")
+
+        self.act_masks = pack_states(mact != 0)
+        self.inh_masks = pack_states(minh != 0)
+        self.no_act = self.act_masks == 0
+        self.regulated = (self.act_masks | self.inh_masks) != 0
+        self._bits = np.left_shift(np.uint64(1), np.arange(self.num_of_nodes, dtype=np.uint64))
+        self.set_clamps(clamps)
+
+    @classmethod
+    def from_network(cls, network, clamp_value=1):
+        """ Boolean network of a CompiledNetwork, with its clamped nodes held at clamp_value """
+        clamps = [(i, clamp_value) for i in np.flatnonzero(network.clamped == 1)]
+        return cls(network.mact, network.minh, clamps)
+
+    def set_clamps(self, clamps):
+        self.clamps = tuple((int(node), int(level)) for node, level in clamps)
+        self.clamp_mask = np.uint64(0)
+        self.clamp_bits = np.uint64(0)
+        for node, level in self.clamps:
+            self.clamp_mask |= self._bits[node]
+            if level:
+                self.clamp_bits |= self._bits[node]
+        # Nodes the dynamics can change once every unregulated node has
+        # decayed to 0 after the first update
+        self.dynamic = np.flatnonzero(self.regulated & ((self._bits & self.clamp_mask) == 0))
+
+    def with_clamps(self, clamps):
+        """ Copy of the network with additional clamps, sharing the edge masks """
+        network = copy.copy(self)
+        network.set_clamps(self.clamps + tuple(clamps))
+        return network
+
+    def _node_values(self, states, nodes):
+        act = self.act_masks[nodes]
+        inh = self.inh_masks[nodes]
+        return self.regulated[nodes] & (((states & act) != 0) | self.no_act[nodes]) & ((states & inh) == 0)
+
+    def _apply_clamps(self, states):
+        return (states & ~self.clamp_mask) | self.clamp_bits
+
+    def update(self, states):
+        """ Synchronous update of every node of every state """
+        states = np.asarray(states, dtype=np.uint64)
+        new = np.zeros_like(states)
+        for i in range(self.num_of_nodes):
+            new |= self._node_values(states, i).astype(np.uint64) << np.uint64(i)
+        return self._apply_clamps(new)
+
+    def update_async(self, states, nodes=None, rng=None):
+        """ Asynchronous update of one node per state, given by nodes or drawn uniformly at random """
+        states = np.asarray(states, dtype=np.uint64)
+        if nodes is None:
+            nodes = np.random.default_rng(rng).integers(self.num_of_nodes, size=states.shape)
+        nodes = np.broadcast_to(nodes, states.shape)
+        bits = self._bits[nodes]
+        new = np.where(self._node_values(states, nodes), states | bits, states & ~bits)
+        return self._apply_clamps(new)
+
+    def state_space(self, start=0, stop=None):
+        """ Block of the states reachable after one update, numbered start to stop
+
+        Only the dynamic (regulated, unclamped) nodes vary; unregulated nodes
+        are 0 and clamped nodes at their level.
+        """
+        stop = 1 << len(self.dynamic) if stop is None else stop
+        index = np.arange(start, stop, dtype=np.uint64)
+        states = np.full(len(index), self.clamp_bits, dtype=np.uint64)
+        for k, node in enumerate(self.dynamic):
+            states |= ((index >> np.uint64(k)) & np.uint64(1)) << np.uint64(node)
+        return states
+
+    def _state_blocks(self, n_samples, seed):
+        if len(self.dynamic) <= EXHAUSTIVE_LIMIT:
+            size = 1 << len(self.dynamic)
+            for start in range(0, size, BLOCK_SIZE):
+                yield self.state_space(start, min(start + BLOCK_SIZE, size))
+        else:
+            rng = np.random.default_rng(seed)
+            all_nodes = self._bits.sum(dtype=np.uint64)
+            for start in range(0, n_samples, BLOCK_SIZE):
+                states = rng.integers(0, all_nodes, min(BLOCK_SIZE, n_samples - start), dtype=np.uint64,
+                                      endpoint=True)
+                yield self._apply_clamps(states)
+
+    def fixed_points(self, n_samples=1 << 20, seed=None):
+        """ Sorted packed fixed points, shared by the synchronous and asynchronous dynamics
+
+        With at most EXHAUSTIVE_LIMIT dynamic nodes every state is checked, so
+        the list is complete; otherwise they are found from the attractors of
+        n_samples random states.
+        """
+        if len(self.dynamic) > EXHAUSTIVE_LIMIT:
+            return np.array(sorted(a.states[0] for a in self.attractors(n_samples=n_samples, seed=seed)
+                                   if len(a.states) == 1), dtype=np.uint64)
+        found = [states[self.update(states) == states] for states in self._state_blocks(0, seed)]
+        return np.concatenate(found)
+
+    def attractors(self, states=None, n_samples=1 << 20, seed=None):
+        """ Synchronous attractors (fixed points and cycles) reached from states
+
+        Without states every state reachable after one update is used when
+        there are at most EXHAUSTIVE_LIMIT dynamic nodes, otherwise n_samples
+        random states. Each trajectory's cycle is found with Floyd's
+        tortoise-and-hare, vectorised over all states. Returns Attractors,
+        each cycle listed from its smallest packed state, with the number of
+        starting states that reach it, largest basin first. The fixed points
+        are those of the asynchronous dynamics too, but synchronous cycles
+        need not be asynchronous attractors; see async_attractors.
+        """
+        blocks = self._state_blocks(n_samples, seed) if states is None \
+            else [np.atleast_1d(np.asarray(states, dtype=np.uint64))]
+        basins = {}
+        for block in blocks:
+            representative = self._cycle_representatives(block)
+            for rep, count in zip(*np.unique(representative, return_counts=True)):
+                basins[rep] = basins.get(rep, 0) + count
+
+        attractors = []
+        for rep, count in sorted(basins.items(), key=lambda item: -item[1]):
+            cycle = [rep]
+            state = self.update(np.array([rep], dtype=np.uint64))[0]
+            while state != rep:
+                cycle.append(state)
+                state = self.update(np.array([state], dtype=np.uint64))[0]
+            attractors.append(Attractor(np.array(cycle, dtype=np.uint64), int(count)))
+        return attractors
+
+    def async_attractors(self):
+        """ Asynchronous attractors: the terminal strongly connected components of the state graph
+
+        Every state reachable after one update is a vertex, with an edge for
+        each dynamic node whose update changes it, so this is exhaustive and
+        limited to ASYNC_LIMIT dynamic nodes. Returns Attractors with their
+        states sorted and the number of states from which they are reachable,
+        largest first; asynchronous basins overlap, so these can add up to
+        more than the number of states.
+        """
+        n_dynamic = len(self.dynamic)
+        if n_dynamic > ASYNC_LIMIT:
+            raise ValueError(f'Asynchronous attractors need at most {ASYNC_LIMIT} dynamic nodes, '
+                             f'the network has {n_dynamic}')
+        states = self.state_space()
+        size = len(states)
+        index = np.arange(size)
+        sources, targets = [], []
+        for k, node in enumerate(self.dynamic):
+            # Updating dynamic node k flips bit k of the state index or leaves it
+            changed = self.update_async(states, node) != states
+            sources.append(index[changed])
+            targets.append(index[changed] ^ (1 << k))
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+        graph = sp.csr_matrix((np.ones(len(sources)), (sources, targets)), shape=(size, size))
+
+        _, labels = csgraph.connected_components(graph, directed=True, connection='strong')
+        leaving = labels[sources] != labels[targets]
+        terminal = np.setdiff1d(np.unique(labels), labels[sources[leaving]])
+        attractors = []
+        for label in terminal:
+            members = np.flatnonzero(labels == label)
+            basin = csgraph.breadth_first_order(graph.T, members[0], directed=True, return_predecessors=False)
+            attractors.append(Attractor(np.sort(states[members]), len(basin)))
+        return sorted(attractors, key=lambda a: -a.basin_size)
+
+    def _cycle_representatives(self, states):
+        # Tortoise and hare meet somewhere on the cycle of every trajectory
+        tortoise = self.update(states)
+        hare = self.update(tortoise)
+        active = np.flatnonzero(tortoise != hare)
+        while len(active):
+            tortoise[active] = self.update(tortoise[active])
+            hare[active] = self.update(self.update(hare[active]))
+            active = active[tortoise[active] != hare[active]]
+
+        # Walk once around the cycle, keeping its smallest state
+        representative = tortoise.copy()
+        current = self.update(tortoise)
+        active = np.flatnonzero(current != tortoise)
+        while len(active):
+            representative[active] = np.minimum(representative[active], current[active])
+            current[active] = self.update(current[active])
+            active = active[current[active] != tortoise[active]]
+        return representative
+
+    def attractor_activity(self, attractors):
+        """ Basin-weighted mean activity (n_nodes,) over the states of the attractors """
+        total = sum(a.basin_size for a in attractors)
+        activity = np.zeros(self.num_of_nodes)
+        for attractor in attractors:
+            activity += attractor.basin_size / total * unpack_states(attractor.states, self.num_of_nodes).mean(axis=0)
+        return activity
+
+def rank_perturbations(boolean_network, perturbations, n_samples=1 << 14, seed=None):
+    """ Boolean pre-screen of perturbations, ranked by the change in mean attractor activity
+
+    Each perturbation (a tuple of (node, level) pairs) is added to the clamps
+    of boolean_network and its attractors are found from the same n_samples
+    random states (or exhaustively for small networks). Returns a
+    BooleanScreenResult with the unperturbed activity (n_nodes,), the deltas
+    (n_perturbations x n_nodes) and the perturbation indices ordered by the
+    sum of absolute deltas, largest first.
+    """
+    baseline = boolean_network.attractor_activity(boolean_network.attractors(n_samples=n_samples, seed=seed))
+    deltas = np.zeros((len(perturbations), boolean_network.num_of_nodes))
+    for p, perturbation in enumerate(perturbations):
+        perturbed = boolean_network.with_clamps(perturbation)
+        deltas[p] = perturbed.attractor_activity(perturbed.attractors(n_samples=n_samples, seed=seed)) - baseline
+    order = np.argsort(-np.abs(deltas).sum(axis=1), kind='stable')
+    return BooleanScreenResult(list(perturbations), baseline, deltas, order)
+
+def attractor_seeds(attractors, num_of_nodes):
+    """ Initial conditions (n_states x n_nodes) at every state of every attractor, to seed steady_state """
+    return unpack_states(np.concatenate([a.states for a in attractors]), num_of_nodes)
@@ -0,0 +1,186 @@
+""" Content-addressed on-disk cache of simulation results
+
+Entries are .npz files named by the SHA-256 of everything that determines a
+result: the network matrices, gamma, h, the clamps, the time grid, the
+solver settings and the seed. The cache is shared between runs and between
+processes. Entries are written to a temporary file and renamed into place,
+so readers never see a partial entry, and eviction of the least recently
+used entries (by modification time, which every hit refreshes) runs under
+an exclusive file lock once the directory grows beyond max_bytes.
+
+    python -m networkmodel --cache ~/.cache/networkmodel baseline
+"""
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction runs without a lock
+    fcntl = None
+
+CACHE_VERSION = 2
+
+def default_directory():
+    """ $MENDOZA_CACHE, or networkmodel under the user cache directory """
+    if os.environ.get('MENDOZA_CACHE'):
+        return os.environ['MENDOZA_CACHE']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'networkmodel')
+
+def _update(digest, value):
+    # Every value is prefixed with its type and size, so different values
+    # never produce the same byte stream
+    if value is None:
+        digest.update(b'N')
+    elif isinstance(value, (bool, np.bool_)):
+        digest.update(b'B1' if value else b'B0')
+    elif isinstance(value, (int, np.integer)):
+        # Exact, so integers beyond 2**53 do not collide as floats would
+        data = str(int(value)).encode()
+        digest.update(b'I%d:' % len(data) + data)
+    elif isinstance(value, (float, np.floating)):
+        _update(digest, np.asarray(value, dtype=float))
+    elif isinstance(value, str):
+        data = value.encode()
+        digest.update(b'S%d:' % len(data) + data)
+    elif isinstance(value, bytes):
+        digest.update(b'Y%d:' % len(value) + value)
+    elif sp.issparse(value):
+        matrix = sp.csr_matrix(value, dtype=float)
+        matrix.sum_duplicates()
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        _update(digest, ('csr', matrix.shape, matrix.data, matrix.indices.astype(np.int64),
+                         matrix.indptr.astype(np.int64)))
+    elif isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        if array.dtype.kind in 'bf':
+            array = array.astype(float)
+        elif array.dtype.kind in 'iu':
+            array = array.astype(np.int64 if array.dtype.kind == 'i' else np.uint64)
+        digest.update(f'A{array.dtype.str}{array.shape}:'.encode())
+        digest.update(array.tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'D%d:' % len(value))
+        for key in sorted(value):
+            _update(digest, str(key))
+            _update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'L%d:' % len(value))
+        for item in value:
+            _update(digest, item)
+    else:
+        raise TypeError(f'Cannot hash a {type(value).__name__} for the result cache')
+
+def cache_key(*parts):
+    """ Hex SHA-256 of arrays, sparse matrices, numbers, strings and nested lists/dicts of them
+
+    Floats and boolean or float arrays are hashed as float64, and integers
+    and integer arrays exactly as (u)int64 with their own type tag, so the
+    integer 3 and the float 3.0 give different keys.
+    """
+    digest = hashlib.sha256(b'networkmodel-cache-%d' % CACHE_VERSION)
+    _update(digest, list(parts))
+    return digest.hexdigest()
+
+def network_key(network):
+    """ Key parts of a CompiledNetwork: its matrices, gamma, h and clamps """
+    return [network.mact, network.minh, network.gamma, network.h, network.clamped]
+
+class ResultCache:
+    """ Bounded directory of .npz results keyed by cache_key """
+
+    def __init__(self, directory=None, max_bytes=1 << 30):
+        self.directory = default_directory() if directory is None else directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        """ dict of the arrays stored under key, or None """
+        path = self.path(key)
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+        except (OSError, ValueError, KeyError, EOFError):
+            # Missing, or removed or corrupted by another process
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return arrays
+
+    def put(self, key, **arrays):
+        """ Store arrays under key, then evict old entries if the cache is over max_bytes """
+        path = self.path(key)
+        tmp = None
+        try:
+            # A unique name per writer, so threads and processes storing the
+            # same key never write into one temporary file
+            with tempfile.NamedTemporaryFile(dir=self.directory, prefix=f'{key}.', suffix='.tmp',
+                                             delete=False) as f:
+                tmp = f.name
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except OSError:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self.evict()
+
+    def cached(self, key, compute):
+        """ Stored arrays of key, or compute() (a dict of arrays) stored under key """
+        arrays = self.get(key)
+        if arrays is None:
+            arrays = compute()
+            self.put(key, **arrays)
+        return arrays
+
+    def entries(self):
+        """ (mtime, size, path) of every entry, oldest first """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.npz'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, max_bytes=None):
+        """ Remove the least recently used entries until the cache fits in max_bytes """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if self.size() <= max_bytes:
+            return
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def clear(self):
+        self.evict(0)
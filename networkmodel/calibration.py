@@ -0,0 +1,345 @@
+""" Calibration of per-node gamma_i, h_i and optionally edge weights against observed fold-changes
+
+Every experiment clamps a set of stimulus nodes at 1 and observes the
+fold-change of some nodes' mean steady state over the unstimulated
+baseline. The loss is the weighted sum of squared log fold-change errors.
+All conditions and initial conditions are solved as one stacked
+steady_state call, polished by a Newton step, and the gradient follows
+from the implicit function theorem: with J the analytic Jacobian at the
+steady states, one adjoint solve J^T lambda = dL/dx per sample gives
+dL/dtheta = -lambda^T df/dtheta for every parameter at once.
+
+Starts are drawn from a Sobol design within the bounds, each is optimised
+with L-BFGS-B in log-parameter space, and the starts are spread over a
+process pool.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import minimize
+from scipy.stats import qmc
+
+from .mendoza import CompiledNetwork
+from .sampling import InitialConditionSampler
+from .sensitivity import GAMMA_BOUNDS, H_BOUNDS
+from .steadystate import steady_state
+
+Experiment = namedtuple('Experiment', ['stimuli', 'observed', 'weights'])
+CalibrationResult = namedtuple('CalibrationResult', ['gamma', 'h', 'mact', 'minh', 'loss', 'start_losses',
+                                                     'start_parameters', 'success', 'n_evaluations',
+                                                     'n_unconverged'])
+
+WEIGHT_BOUNDS = (0.1, 10.0)
+
+_worker = {}
+
+def load_experiments(filename, node_names):
+    """ Experiments from a spreadsheet or CSV with one row per experiment
+
+    The 'Stimuli' column lists the clamped nodes separated by commas and
+    every other column named after a node holds its observed fold-change
+    (blank where it was not measured). An optional 'Weight' column scales
+    the row's errors.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(filename) if filename.endswith('.csv') else pd.read_excel(filename)
+    df.columns = [str(col).strip() for col in df.columns]
+    unknown = set(df.columns) - set(node_names) - {'Stimuli', 'Weight'}
+    if unknown:
+        raise ValueError(f'Unknown node columns {sorted(unknown)}')
+
+    experiments = []
+    for _, row in df.iterrows():
+        stimuli = [name.strip() for name in str(row['Stimuli']).split(',') if name.strip()]
+        missing = set(stimuli) - set(node_names)
+        if missing:
+            raise ValueError(f'Unknown stimuli {sorted(missing)}')
+        observed = np.array([row.get(name, np.nan) for name in node_names], dtype=float)
+        weight = float(row['Weight']) if 'Weight' in df.columns else 1.0
+        experiments.append(Experiment(stimuli, observed, np.where(np.isnan(observed), 0.0, weight)))
+    return experiments
+
+class CalibrationObjective:
+    """ Loss and exact gradient of the log fold-change errors over log parameters
+
+    The parameter vector is log(gamma_1..n), log(h_1..n) and, with
+    fit_edges, the log weights of every nonzero entry of mact followed by
+    minh. Each condition is solved from the same n_samples Sobol initial
+    conditions (stimuli start at 1) and its mean steady state is compared.
+    With warm_start, each evaluation continues the steady states of the
+    previous one by Newton's method, so in multistable regions the branch
+    followed depends on the optimizer's path.
+
+    Samples that do not reach a steady state (e.g. on a limit cycle) are
+    left out of their condition's mean and gradient; a condition in which
+    none converged keeps all its samples. n_unconverged counts them for the
+    last evaluation.
+    """
+
+    def __init__(self, mact, minh, node_names, experiments, n_samples=16, seed=0, fit_edges=False, tol=1e-8,
+                 eps=1e-6, warm_start=True):
+        self.mact = np.asarray(mact.toarray() if sp.issparse(mact) else mact, dtype=float)
+        self.minh = np.asarray(minh.toarray() if sp.issparse(minh) else minh, dtype=float)
+        self.node_names = list(node_names)
+        self.num_of_nodes = len(self.node_names)
+        self.fit_edges = fit_edges
+        self.tol = tol
+        self.eps = eps
+        self.act_edges = np.argwhere(self.mact != 0)
+        self.inh_edges = np.argwhere(self.minh != 0)
+        self.n_parameters = 2 * self.num_of_nodes + (len(self.act_edges) + len(self.inh_edges) if fit_edges else 0)
+
+        index = {name: i for i, name in enumerate(self.node_names)}
+        n_conditions = len(experiments) + 1
+        clamped = np.zeros((n_conditions, self.num_of_nodes))
+        for c, experiment in enumerate(experiments, start=1):
+            clamped[c, [index[name] for name in experiment.stimuli]] = 1
+        self.n_samples = n_samples
+        self.n_conditions = n_conditions
+        self.clamped = np.repeat(clamped, n_samples, axis=0)
+        self.xinit = np.tile(InitialConditionSampler(self.num_of_nodes, 'sobol', seed).draw(n_samples),
+                             (n_conditions, 1))
+        self.xinit[self.clamped == 1] = 1
+        self.log_observed = np.log(np.where(np.isnan([e.observed for e in experiments]), 1,
+                                            [e.observed for e in experiments]))
+        self.weights = np.array([e.weights for e in experiments], dtype=float)
+        self.warm_start = warm_start
+        self._previous = None
+        self.n_evaluations = 0
+        self.n_unconverged = 0
+
+    def reset(self):
+        """ Forget the warm-start states, so the next evaluation starts from xinit """
+        self._previous = None
+        self.n_evaluations = 0
+        self.n_unconverged = 0
+
+    def initial_parameters(self, gamma=1.0, h=10.0):
+        """ Log parameter vector of the given gamma, h and the current edge weights """
+        parts = [np.log(np.broadcast_to(gamma, (self.num_of_nodes,))),
+                 np.log(np.broadcast_to(h, (self.num_of_nodes,)))]
+        if self.fit_edges:
+            parts += [np.log(self.mact[tuple(self.act_edges.T)]), np.log(self.minh[tuple(self.inh_edges.T)])]
+        return np.concatenate(parts)
+
+    def bounds(self, gamma_bounds=GAMMA_BOUNDS, h_bounds=H_BOUNDS, weight_bounds=WEIGHT_BOUNDS):
+        """ Lower and upper bounds (2, n_parameters) of the log parameters """
+        n = self.num_of_nodes
+        lower = [np.full(n, gamma_bounds[0]), np.full(n, h_bounds[0])]
+        upper = [np.full(n, gamma_bounds[1]), np.full(n, h_bounds[1])]
+        if self.fit_edges:
+            n_edges = len(self.act_edges) + len(self.inh_edges)
+            lower.append(np.full(n_edges, weight_bounds[0]))
+            upper.append(np.full(n_edges, weight_bounds[1]))
+        return np.log(np.vstack((np.concatenate(lower), np.concatenate(upper))))
+
+    def unpack(self, theta):
+        """ gamma, h, mact and minh of a log parameter vector """
+        n = self.num_of_nodes
+        p = np.exp(theta)
+        mact, minh = self.mact, self.minh
+        if self.fit_edges:
+            n_act = len(self.act_edges)
+            mact = self.mact.copy()
+            mact[tuple(self.act_edges.T)] = p[2 * n:2 * n + n_act]
+            minh = self.minh.copy()
+            minh[tuple(self.inh_edges.T)] = p[2 * n + n_act:]
+        return p[:n], p[n:2 * n], mact, minh
+
+    def steady_states(self, theta):
+        """ Network, polished steady states (n_conditions * n_samples, n_nodes), Jacobians and converged flags """
+        gamma, h, mact, minh = self.unpack(theta)
+        network = CompiledNetwork(mact, minh, gamma, h, self.clamped)
+        if self.warm_start and self._previous is not None:
+            # Follow the previous steady states by Newton's method, which is
+            # what consecutive optimizer steps need; samples that do not
+            # converge to a stable state are solved from their initial conditions
+            x, converged = self._newton(network, self._previous)
+            if not np.all(converged):
+                fallback = CompiledNetwork(mact, minh, gamma, h, self.clamped[~converged])
+                result = steady_state(fallback, self.xinit[~converged], tol=self.tol)
+                x[~converged] = result.x
+                converged[~converged] = result.converged
+        else:
+            result = steady_state(network, self.xinit, tol=self.tol)
+            x, converged = result.x, result.converged
+        # One Newton step makes the states (and so the gradient) accurate well
+        # below tol; samples that did not settle are not near a root, so they
+        # are left where the integration stopped
+        jac = self._jacobian(network, x)
+        settled = network.take_samples(converged)
+        x[converged] -= np.linalg.solve(jac[converged], settled.rhs(x[converged])[..., None])[..., 0]
+        with np.errstate(over='ignore', invalid='ignore'):
+            converged &= np.all(np.abs(network.rhs(x)) < self.tol, axis=1)
+        self._previous = x
+        self.n_unconverged = int(np.sum(~converged))
+        return network, x, jac, converged
+
+    def _sample_weights(self, converged):
+        # Each condition's mean is taken over its converged samples; one
+        # without any keeps them all rather than having no mean
+        ok = converged.reshape(self.n_conditions, self.n_samples)
+        ok = np.where(ok.any(axis=1, keepdims=True), ok, True)
+        return (ok / ok.sum(axis=1, keepdims=True)).ravel()
+
+    def _means(self, x, weights):
+        return (x * weights[:, None]).reshape(self.n_conditions, self.n_samples, -1).sum(axis=1)
+
+    def _jacobian(self, network, x):
+        # Clamped rows of the Jacobian are zero; a unit diagonal there keeps
+        # their states fixed in the Newton and adjoint solves
+        jac = network.jacobian(x)
+        diag = np.arange(self.num_of_nodes)
+        jac[:, diag, diag] += 1 - network.free
+        return jac
+
+    def _newton(self, network, x, max_iter=8):
+        # Iterates that diverge only mark their samples for the fallback
+        with np.errstate(over='ignore', invalid='ignore'):
+            return self._newton_iterate(network, x, max_iter)
+
+    def _newton_iterate(self, network, x, max_iter):
+        x = x.copy()
+        for _ in range(max_iter):
+            jac = self._jacobian(network, x)
+            try:
+                x -= np.linalg.solve(jac, network.rhs(x)[..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                return x, np.zeros(len(x), dtype=bool)
+        converged = np.all(np.abs(network.rhs(x)) < self.tol, axis=1) & np.all(np.isfinite(x), axis=1)
+        # Stable means every eigenvalue of the free block has a negative real
+        # part; clamped nodes get -1 in place of their unit diagonal
+        jac = self._jacobian(network, np.where(np.isfinite(x), x, 0))
+        diag = np.arange(self.num_of_nodes)
+        jac[:, diag, diag] -= 2 * (1 - network.free)
+        stable = np.max(np.linalg.eigvals(jac).real, axis=1) < 0
+        return x, converged & stable
+
+    def predict(self, theta):
+        """ Log fold-changes (n_experiments, n_nodes) and mean states (n_conditions, n_nodes) of theta """
+        _, x, _, converged = self.steady_states(theta)
+        means = self._means(x, self._sample_weights(converged))
+        log_means, _ = self._log_means(means)
+        return log_means[1:] - log_means[0], means
+
+    def _log_means(self, means):
+        # With gamma_i < 1 states can exceed 1 and push inhibited nodes below
+        # 0, so nodes near 0 switch sign with the parameters. A smooth ramp
+        # max(m, 0) ~ (m + sqrt(m^2 + eps^2)) / 2 floored at eps keeps the
+        # loss differentiable there; it returns log(ramp + eps) and its slope.
+        root = np.sqrt(means ** 2 + self.eps ** 2)
+        ramp = 0.5 * (means + root) + self.eps
+        return np.log(ramp), 0.5 * (1 + means / root) / ramp
+
+    def __call__(self, theta):
+        """ Loss and its gradient with respect to theta """
+        self.n_evaluations += 1
+        network, x, jac, converged = self.steady_states(theta)
+        weights = self._sample_weights(converged)
+        means = self._means(x, weights)
+        log_means, slope = self._log_means(means)
+        residual = log_means[1:] - log_means[0] - self.log_observed
+        loss = np.sum(self.weights * residual ** 2)
+
+        # dL/dmean of every condition, shared by its samples
+        dmean = np.zeros_like(means)
+        dmean[1:] = 2 * self.weights * residual
+        dmean[0] = -dmean[1:].sum(axis=0)
+        dmean *= slope
+        dx = np.repeat(dmean, self.n_samples, axis=0) * weights[:, None]
+        # Samples left out of the means need no adjoint
+        used = weights > 0
+        adjoint = np.zeros_like(x)
+        adjoint[used] = np.linalg.solve(np.swapaxes(jac[used], 1, 2), dx[used][..., None])[..., 0]
+        adjoint *= network.free
+        return loss, self._gradient(network, x, adjoint) * np.exp(theta)
+
+    def _gradient(self, network, x, adjoint):
+        # dL/dp = -sum over samples of adjoint . df/dp
+        sum_alpha_x, sum_beta_x, act, inh = network._terms(x)
+        w = act * inh * network.has_any
+        e = np.exp(-network.h * (w - 0.5))
+        big = network.exp_half_h
+        norm = network.sigmoid_norm
+        dsigmoid_dw = -network.h * e * (1 + big) * norm / (1 + e) ** 2
+        de = -(w - 0.5) * e
+        dbig = 0.5 * big
+        dsigmoid_dh = ((de - dbig) * norm + (e - big) * norm ** 2 * dbig) / (1 + e) - (e - big) * norm * de / (1 + e) ** 2
+
+        grads = [np.sum(adjoint * x, axis=0), -np.sum(adjoint * dsigmoid_dh, axis=0)]
+        if self.fit_edges:
+            mact = network.mact
+            minh = network.minh
+            rows, cols = self.act_edges.T
+            total = mact.sum(axis=1)[rows]
+            s = sum_alpha_x[:, rows]
+            dact = -s / (1 + s) / total ** 2 + network.k_act[rows] * x[:, cols] / (1 + s) ** 2
+            grads.append(-np.sum(adjoint[:, rows] * dsigmoid_dw[:, rows] * inh[:, rows] * dact, axis=0))
+            rows, cols = self.inh_edges.T
+            total = minh.sum(axis=1)[rows]
+            t = sum_beta_x[:, rows]
+            dinh = t / (1 + t) / total ** 2 - network.k_inh[rows] * x[:, cols] / (1 + t) ** 2
+            grads.append(-np.sum(adjoint[:, rows] * dsigmoid_dw[:, rows] * act[:, rows] * dinh, axis=0))
+        return np.concatenate(grads)
+
+def check_gradient(objective, theta, eps=1e-6):
+    """ Largest absolute difference between the adjoint gradient and central finite differences at theta """
+    _, grad = objective(theta)
+    fd = np.zeros_like(grad)
+    for k in range(len(theta)):
+        step = np.zeros_like(theta)
+        step[k] = eps
+        fd[k] = (objective(theta + step)[0] - objective(theta - step)[0]) / (2 * eps)
+    return np.max(np.abs(grad - fd))
+
+def _init_worker(objective, bounds, options):
+    _worker['objective'] = objective
+    _worker['bounds'] = bounds
+    _worker['options'] = options
+
+def _run_start(theta0):
+    objective = _worker['objective']
+    objective.reset()
+    result = minimize(objective, theta0, jac=True, method='L-BFGS-B', bounds=_worker['bounds'].T,
+                      options=_worker['options'])
+    return result.x, result.fun, result.success, objective.n_evaluations
+
+def calibrate(mact, minh, node_names, experiments, n_starts=8, fit_edges=False, n_samples=16, seed=0,
+              gamma_bounds=GAMMA_BOUNDS, h_bounds=H_BOUNDS, weight_bounds=WEIGHT_BOUNDS, max_iter=200,
+              processes=None):
+    """ Multi-start L-BFGS-B fit of gamma_i, h_i (and edge weights) to the experiments
+
+    The first start is gamma=1, h=10 with the current edge weights; the
+    others are a scrambled Sobol design over the log bounds. Starts run in
+    a process pool (processes=1 runs them in this process). Returns a
+    CalibrationResult with the best parameters, the final loss and log
+    parameters of every start, and the number of samples that did not reach
+    a steady state at the best parameters.
+    """
+    objective = CalibrationObjective(mact, minh, node_names, experiments, n_samples, seed, fit_edges)
+    bounds = objective.bounds(gamma_bounds, h_bounds, weight_bounds)
+    m = int(np.ceil(np.log2(max(n_starts - 1, 1))))
+    design = qmc.Sobol(objective.n_parameters, seed=seed).random_base2(m)[:n_starts - 1]
+    starts = [np.clip(objective.initial_parameters(), *bounds)]
+    starts += list(bounds[0] + design * (bounds[1] - bounds[0]))
+    initargs = (objective, bounds, {'maxiter': max_iter})
+
+    if processes == 1:
+        _init_worker(*initargs)
+        outcomes = [_run_start(theta0) for theta0 in starts]
+    else:
+        workers = min(processes or os.cpu_count() or 1, len(starts))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+            outcomes = list(executor.map(_run_start, starts))
+
+    thetas, losses, success, evaluations = zip(*outcomes)
+    best = int(np.argmin(losses))
+    gamma, h, mact, minh = objective.unpack(thetas[best])
+    objective.reset()
+    objective.steady_states(thetas[best])
+    return CalibrationResult(gamma, h, mact, minh, losses[best], np.array(losses), np.array(thetas),
+                             bool(success[best]), int(np.sum(evaluations)), objective.n_unconverged)
@@ -0,0 +1,359 @@
+""" Command line interface of the Mendoza network model
+
+    python -m networkmodel baseline
+    python -m networkmodel stimulate IL-1β
+    python -m networkmodel export-sbml --output model.xml
+    python -m networkmodel simulate-sbml model.xml
+    python -m networkmodel serve --port 8765
+    python -m networkmodel calibrate foldchanges.xlsx --starts 16
+    python -m networkmodel basins --stimuli IL-1β
+    python -m networkmodel --cache ~/.cache/networkmodel baseline
+
+Only argparse is imported up front; each subcommand imports what it needs
+(numpy and scipy for the simulations, h5py and pandas for the results,
+libsbml or roadrunner for the SBML commands, matplotlib for plots, which
+are rendered headless with the Agg backend unless --show is given).
+"""
+import argparse
+import contextlib
+import os
+import sys
+
+NETWORK_FILE = 'SMENR1.xlsx'
+
+def _stage(name):
+    from . import instrumentation
+    return instrumentation.stage(name)
+
+def _network(args):
+    from .mendoza import CompiledNetwork
+    from .network import load_network
+
+    with _stage('load'):
+        mact, minh, node_names, _, _ = load_network(args.network)
+    return CompiledNetwork(mact, minh, args.gamma, args.h), node_names
+
+def _cache(args):
+    if not args.cache:
+        return None
+    from .cache import ResultCache
+    return ResultCache(args.cache, int(args.cache_max_mb * (1 << 20)))
+
+@contextlib.contextmanager
+def _result_writer(filename, node_names, parameters, clamped):
+    """ ResultWriter on filename that the ensemble streams its batches into, or None without a filename """
+    if not filename:
+        yield None
+        return
+    from .results import ResultWriter
+
+    with ResultWriter(filename, node_names, parameters=parameters, clamped=clamped) as writer:
+        yield writer
+    print(f'Results saved to {filename}')
+
+def _write_summary(filename, summary, node_names, result):
+    if not summary:
+        return
+    from .results import ResultReader, export_summary_excel
+
+    with _stage('write'):
+        if filename:
+            with ResultReader(filename) as reader:
+                export_summary_excel(reader, summary)
+        else:
+            import pandas as pd
+            pd.DataFrame([result.mean, result.median, result.std], index=['mean', 'median', 'std'],
+                         columns=node_names).to_excel(summary)
+    print(f'Summary saved to {summary}')
+
+def _baseline(network, args, writer=None):
+    from .sampling import adaptive_ensemble
+
+    # Sample until the mean and median of every node are known to +-tol
+    with _stage('baseline'):
+        baseline = adaptive_ensemble(network, tol=args.tol, sampler=args.sampler, seed=args.seed,
+                                     writer=writer, cache=args.result_cache)
+    print(f'Baseline: {baseline.n_samples} samples ({baseline.n_unconverged} did not settle), '
+          f'converged: {baseline.converged}')
+    return baseline
+
+def _baseline_outputs(network, node_names, args, output, summary, plot):
+    """ Baseline ensemble streamed to output, with its summary and bar plot; empty names are skipped """
+    with _result_writer(output, node_names, {'gamma': args.gamma, 'h': args.h}, network.clamped) as writer:
+        baseline = _baseline(network, args, writer)
+    _write_summary(output, summary, node_names, baseline)
+    if plot:
+        from .plotting import baseline_bar_plot
+        with _stage('plot'):
+            baseline_bar_plot(baseline.mean, node_names, plot)
+    return baseline
+
+def cmd_baseline(args):
+    network, node_names = _network(args)
+    _baseline_outputs(network, node_names, args, args.output, args.summary, args.plot)
+    return 0
+
+def cmd_stimulate(args):
+    import numpy as np
+    from .sampling import adaptive_ensemble
+
+    network, node_names = _network(args)
+    # The baseline the stimulation is compared with can be written as well,
+    # which saves running the baseline command separately
+    baseline = _baseline_outputs(network, node_names, args, args.baseline_output, args.baseline_summary,
+                                 args.baseline_plot)
+
+    clamped = np.zeros(network.num_of_nodes)
+    clamped[[node_names.index(name) for name in args.stimuli]] = 1
+    network.set_clamped(clamped)
+    label = '_'.join(args.stimuli)
+    output = f'Xbaseline1_{label}.h5' if args.output is None else args.output
+    summary = f'Xbaseline1_{label}.xlsx' if args.summary is None else args.summary
+    # Every sample starts from its own initial condition (the clamped nodes at 1)
+    parameters = {'gamma': args.gamma, 'h': args.h, 't_end': args.t_end}
+    with _result_writer(output, node_names, parameters, clamped) as writer, _stage('stimulate'):
+        stimulated = adaptive_ensemble(network, tol=args.tol, sampler=args.sampler, seed=args.seed + 1,
+                                       t_end=args.t_end, writer=writer, cache=args.result_cache)
+        print(f"{', '.join(args.stimuli)}: {stimulated.n_samples} samples, converged: {stimulated.converged}")
+    _write_summary(output, summary, node_names, stimulated)
+    plot = f'stimuli_{label}.png' if args.plot is None else args.plot
+    if plot:
+        from .plotting import stimulus_bar_plot
+        with _stage('plot'):
+            stimulus_bar_plot(baseline.mean, stimulated.mean, node_names, f"Stimuli {' '.join(args.stimuli)}", plot)
+    return 0
+
+def cmd_export_sbml(args):
+    import numpy as np
+    from .network import load_network
+    from .sbmlgenerator import export_to_sbml_with_params
+
+    mact, minh, node_names, num_of_nodes, _ = load_network(args.network)
+    xinit = np.random.default_rng(args.seed).random(num_of_nodes)
+    clamped = np.zeros(num_of_nodes)
+    export_to_sbml_with_params(args.output, node_names, mact, minh, xinit, clamped, args.gamma, args.h,
+                               mode=args.mode)
+    print(f'SBML model saved to {args.output}')
+    return 0
+
+def cmd_simulate_sbml(args):
+    import numpy as np
+    import roadrunner
+
+    try:
+        rr = roadrunner.RoadRunner(args.model)
+    except Exception as e:
+        print(f"Error loading SBML model: {e}", file=sys.stderr)
+        return 1
+    species_ids = list(rr.model.getFloatingSpeciesIds())
+    if not species_ids:
+        print("No floating species found in the model.", file=sys.stderr)
+        return 1
+
+    rr.timeCourseSelections = ['time'] + [f'[{s}]' for s in species_ids]
+    with _stage('simulate'):
+        def simulate():
+            return {'results': np.array(rr.simulate(args.t_start, args.t_end, args.points))}
+        if args.result_cache is None:
+            results = simulate()['results']
+        else:
+            from .cache import cache_key
+            from .network import file_hash
+            key = cache_key('simulate_sbml', file_hash(args.model), species_ids, args.t_start, args.t_end,
+                            args.points)
+            results = args.result_cache.cached(key, simulate)['results']
+    print(f"{'species':<20} {'final':>12}")
+    for species, value in zip(species_ids, results[-1, 1:]):
+        print(f'{species:<20} {value:>12.6g}')
+
+    if args.plot or args.show:
+        from .plotting import trajectory_plot
+        with _stage('plot'):
+            trajectory_plot(results[:, 0], results[:, 1:], species_ids, args.plot, args.show)
+        if args.plot:
+            print(f'Plot saved to {args.plot}')
+    return 0
+
+def cmd_serve(args):
+    from .network import load_network
+    from .service import SimulationService, serve
+
+    mact, minh, node_names, _, _ = load_network(args.network)
+    service = SimulationService(mact, minh, node_names, args.gamma, args.h, n_samples=args.samples,
+                                seed=args.seed, batch_window=args.batch_window, max_batch=args.max_batch,
+                                cache_size=args.cache_size, backend=args.backend, sbml_file=args.model)
+    serve(service, args.host, args.port)
+    return 0
+
+def cmd_calibrate(args):
+    import json
+    import numpy as np
+    from .calibration import calibrate, load_experiments
+    from .network import load_network
+
+    mact, minh, node_names, _, _ = load_network(args.network)
+    experiments = load_experiments(args.data, node_names)
+    with _stage('calibrate'):
+        result = calibrate(mact, minh, node_names, experiments, n_starts=args.starts, fit_edges=args.fit_edges,
+                           n_samples=args.samples, seed=args.seed, max_iter=args.max_iter,
+                           processes=args.processes)
+    print(f'Best loss {result.loss:.6g} of {args.starts} starts ({result.n_evaluations} evaluations), '
+          f'converged: {result.success}, samples without a steady state: {result.n_unconverged}')
+
+    calibrated = {
+        'loss': result.loss,
+        'start_losses': result.start_losses.tolist(),
+        'n_unconverged': result.n_unconverged,
+        'gamma': dict(zip(node_names, result.gamma.tolist())),
+        'h': dict(zip(node_names, result.h.tolist())),
+    }
+    if args.fit_edges:
+        for name, matrix in (('activation_weights', result.mact), ('inhibition_weights', result.minh)):
+            calibrated[name] = [[node_names[i], node_names[j], matrix[i, j]] for i, j in np.argwhere(matrix != 0)]
+    with open(args.output, 'w') as f:
+        json.dump(calibrated, f, indent=2, ensure_ascii=False)
+    print(f'Calibrated parameters saved to {args.output}')
+    return 0
+
+def cmd_basins(args):
+    import numpy as np
+    from .basins import basin_analysis
+
+    network, node_names = _network(args)
+    if args.stimuli:
+        clamped = np.zeros(network.num_of_nodes)
+        clamped[[node_names.index(name) for name in args.stimuli]] = 1
+        network.set_clamped(clamped)
+    with _stage('basins'):
+        result = basin_analysis(network, tol=args.tol, sampler=args.sampler, seed=args.seed,
+                                max_samples=args.max_samples, state_tol=args.state_tol,
+                                capture_radius=args.capture_radius)
+    print(f'{len(result.attractors)} attractors from {result.n_samples} samples '
+          f'({result.n_captured} captured early, {result.n_unsettled} unsettled), converged: {result.converged}')
+    for k, state in enumerate(result.attractors):
+        active = ', '.join(name for name, x in zip(node_names, state) if x > 0.5) or '-'
+        print(f'{k:>3} {result.fractions[k]:8.4f} +- {result.fraction_halfwidths[k]:.4f}  '
+              f'max Re(eig) {result.max_eigenvalues[k]:8.3f}  active: {active}')
+
+    if args.output:
+        import csv
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            out = csv.writer(f)
+            out.writerow(['attractor', 'count', 'fraction', 'fraction_halfwidth', 'max_eigenvalue',
+                          'mean_settle_time'] + node_names)
+            for k, state in enumerate(result.attractors):
+                out.writerow([k, result.counts[k], result.fractions[k], result.fraction_halfwidths[k],
+                              result.max_eigenvalues[k], result.mean_settle_time[k]] + state.tolist())
+        print(f'Attractors saved to {args.output}')
+    return 0
+
+def _add_model_arguments(parser):
+    parser.add_argument('--network', default=NETWORK_FILE, help='network spreadsheet (default: %(default)s)')
+    parser.add_argument('--gamma', type=float, default=1.0, help='decay rate of every node (default: %(default)s)')
+    parser.add_argument('--h', type=float, default=10.0, help='steepness of every node (default: %(default)s)')
+
+def _add_sampling_arguments(parser):
+    parser.add_argument('--tol', type=float, default=1e-3,
+                        help='confidence interval half-width at which sampling stops (default: %(default)s)')
+    parser.add_argument('--sampler', choices=('random', 'sobol', 'lhs'), default='sobol')
+    parser.add_argument('--seed', type=int, default=0)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='networkmodel', description='Mendoza network model simulations')
+    parser.add_argument('--profile', metavar='FILE', default=os.environ.get('MENDOZA_PROFILE'),
+                        help='record solver statistics and stage timings, written as JSON or CSV '
+                             '(default: $MENDOZA_PROFILE)')
+    parser.add_argument('--cache', metavar='DIR', default=os.environ.get('MENDOZA_CACHE'),
+                        help='reuse simulation results stored in DIR across runs (default: $MENDOZA_CACHE)')
+    parser.add_argument('--no-cache', dest='cache', action='store_const', const=None,
+                        help='ignore $MENDOZA_CACHE')
+    parser.add_argument('--cache-max-mb', type=float, default=1024,
+                        help='size above which the least recently used results are evicted (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    baseline = subparsers.add_parser('baseline', help='unstimulated steady-state ensemble')
+    _add_model_arguments(baseline)
+    _add_sampling_arguments(baseline)
+    baseline.add_argument('--output', default='Xbaseline.h5', help='HDF5 file of the final states')
+    baseline.add_argument('--summary', default='Xbaseline.xlsx', help="Excel summary ('' to skip)")
+    baseline.add_argument('--plot', default='median_baseline.png', help="bar plot ('' to skip)")
+    baseline.set_defaults(run=cmd_baseline)
+
+    stimulate = subparsers.add_parser('stimulate', help='ensemble with stimulus nodes clamped at 1')
+    stimulate.add_argument('stimuli', nargs='+', help='names of the stimulated nodes, e.g. IL-1β')
+    _add_model_arguments(stimulate)
+    _add_sampling_arguments(stimulate)
+    stimulate.add_argument('--t-end', type=float, default=99, help='integration time (default: %(default)s)')
+    stimulate.add_argument('--output', help='HDF5 file (default: Xbaseline1_<stimuli>.h5)')
+    stimulate.add_argument('--summary', help='Excel summary (default: Xbaseline1_<stimuli>.xlsx)')
+    stimulate.add_argument('--plot', help='bar plot against the baseline (default: stimuli_<stimuli>.png)')
+    stimulate.add_argument('--baseline-output', help='also write the baseline final states to this HDF5 file')
+    stimulate.add_argument('--baseline-summary', help='also write the baseline Excel summary')
+    stimulate.add_argument('--baseline-plot', help='also write the baseline bar plot')
+    stimulate.set_defaults(run=cmd_stimulate)
+
+    export = subparsers.add_parser('export-sbml', help='write the network as an SBML model')
+    _add_model_arguments(export)
+    export.add_argument('--output', default='model.xml')
+    export.add_argument('--mode', choices=('rate_rules', 'reactions'), default='rate_rules')
+    export.add_argument('--seed', type=int, default=None, help='seed of the random initial concentrations')
+    export.set_defaults(run=cmd_export_sbml)
+
+    simulate = subparsers.add_parser('simulate-sbml', help='simulate an SBML model with RoadRunner')
+    simulate.add_argument('model', nargs='?', default='model.xml')
+    simulate.add_argument('--t-start', type=float, default=0)
+    simulate.add_argument('--t-end', type=float, default=30)
+    simulate.add_argument('--points', type=int, default=100)
+    simulate.add_argument('--plot', default='simulation.png', help="trajectory plot ('' to skip)")
+    simulate.add_argument('--show', action='store_true', help='open the plot in an interactive window')
+    simulate.set_defaults(run=cmd_simulate_sbml)
+
+    service = subparsers.add_parser('serve', help='local HTTP/JSON service answering clamp queries')
+    _add_model_arguments(service)
+    service.add_argument('--host', default='127.0.0.1', help='loopback address to bind (default: %(default)s)')
+    service.add_argument('--port', type=int, default=8765)
+    service.add_argument('--samples', type=int, default=32, help='initial conditions per query')
+    service.add_argument('--seed', type=int, default=0)
+    service.add_argument('--batch-window', type=float, default=0.005, help='seconds to wait for more queries')
+    service.add_argument('--max-batch', type=int, default=64)
+    service.add_argument('--cache-size', type=int, default=1024)
+    service.add_argument('--backend', choices=('ode', 'roadrunner'), default='ode')
+    service.add_argument('--model', default='model.xml', help='SBML model of the roadrunner backend')
+    service.set_defaults(run=cmd_serve)
+
+    fit = subparsers.add_parser('calibrate', help='fit gamma_i, h_i (and edge weights) to observed fold-changes')
+    fit.add_argument('data', help="spreadsheet or CSV with a 'Stimuli' column and one fold-change column per node")
+    fit.add_argument('--network', default=NETWORK_FILE, help='network spreadsheet (default: %(default)s)')
+    fit.add_argument('--starts', type=int, default=8, help='optimizer starts (default: %(default)s)')
+    fit.add_argument('--fit-edges', action='store_true', help='also fit the weight of every edge')
+    fit.add_argument('--samples', type=int, default=16, help='initial conditions per condition')
+    fit.add_argument('--seed', type=int, default=0)
+    fit.add_argument('--max-iter', type=int, default=200, help='L-BFGS-B iterations per start')
+    fit.add_argument('--processes', type=int, default=None, help='worker processes (default: all cores)')
+    fit.add_argument('--output', default='calibrated.json')
+    fit.set_defaults(run=cmd_calibrate)
+
+    basins = subparsers.add_parser('basins', help='distinct attractors and their basin fractions')
+    _add_model_arguments(basins)
+    _add_sampling_arguments(basins)
+    basins.set_defaults(tol=1e-2)
+    basins.add_argument('--stimuli', nargs='+', default=(), help='nodes clamped at 1')
+    basins.add_argument('--max-samples', type=int, default=10000)
+    basins.add_argument('--state-tol', type=float, default=1e-3,
+                        help='max-norm distance below which two steady states are one attractor')
+    basins.add_argument('--capture-radius', type=float, default=0.02,
+                        help='distance to a known stable attractor at which a trajectory stops (0 to disable)')
+    basins.add_argument('--output', help='CSV of the attractors')
+    basins.set_defaults(run=cmd_basins)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.result_cache = _cache(args)
+    if args.profile:
+        from . import instrumentation
+        instrumentation.enable()
+        status = args.run(args)
+        instrumentation.report(args.profile)
+        return status
+    return args.run(args)
@@ -0,0 +1,271 @@
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from .steadystate import steady_state
+
+ContinuationResult = namedtuple('ContinuationResult', ['parameter', 'x', 'stable', 'special_points', 'message'])
+SpecialPoint = namedtuple('SpecialPoint', ['kind', 'index', 'parameter', 'x'])
+SweepResult = namedtuple('SweepResult', ['parameter', 'x', 'converged', 'newton'])
+
+PARAMETERS = ('h', 'gamma', 'clamp')
+
+class _ParameterSystem:
+    """ Steady-state equations F(u, p) = 0 of the free nodes u for one continuation parameter p
+
+    parameter is 'h' or 'gamma' (the same value for every node), ('h', i) or
+    ('gamma', i) for node i only, or ('clamp', i) for the level at which node
+    i is clamped. Clamped nodes keep their value in x0.
+    """
+
+    def __init__(self, network, parameter, x0):
+        kind, node = (parameter, None) if isinstance(parameter, str) else parameter
+        if kind not in PARAMETERS or (kind == 'clamp' and node is None):
+            raise ValueError(f"Unknown continuation parameter {parameter!r}")
+        self.kind = kind
+        self.node = node
+        if kind == 'clamp':
+            clamped = network.clamped.copy()
+            clamped[node] = 1
+            network = network.with_parameters()
+            network.set_clamped(clamped)
+        self.network = network
+        self.free = np.flatnonzero(network.free)
+        self.x0 = np.array(x0, dtype=float)
+
+    def at(self, p):
+        """ The network with parameter value p """
+        if self.kind == 'clamp':
+            return self.network
+        values = np.array(np.broadcast_to(getattr(self.network, self.kind), (self.network.num_of_nodes,)))
+        if self.node is None:
+            values[:] = p
+        else:
+            values[self.node] = p
+        return self.network.with_parameters(**{self.kind: values})
+
+    def expand(self, u, p):
+        """ Full state (n_nodes,) from the free nodes u """
+        x = self.x0.copy()
+        x[self.free] = u
+        if self.kind == 'clamp':
+            x[self.node] = p
+        return x
+
+    def residual(self, u, p):
+        return self.at(p).rhs(self.expand(u, p))[self.free]
+
+    def jacobian(self, u, p):
+        """ dF/du (n_free x n_free), dense """
+        jac = self.at(p).jacobian(self.expand(u, p))
+        if sp.issparse(jac):
+            jac = jac.toarray()
+        return jac[np.ix_(self.free, self.free)]
+
+    def dparameter(self, u, p):
+        """ dF/dp by central differences """
+        eps = 1e-6 * max(1, abs(p))
+        return (self.residual(u, p + eps) - self.residual(u, p - eps)) / (2 * eps)
+
+    def newton(self, u, p, tol, max_iter):
+        """ Newton iteration on F(u, p) = 0 at fixed p; returns u, converged, iterations """
+        for k in range(1, max_iter + 1):
+            step = np.linalg.solve(self.jacobian(u, p), -self.residual(u, p))
+            u = u + step
+            if np.max(np.abs(step)) < tol:
+                return u, True, k
+        return u, False, max_iter
+
+def _tangent(jac_u, jac_p, previous=None):
+    # Null vector of [F_u F_p], oriented along the previous tangent
+    _, _, vt = np.linalg.svd(np.column_stack([jac_u, jac_p]))
+    tangent = vt[-1]
+    if previous is not None and tangent @ previous < 0:
+        tangent = -tangent
+    return tangent
+
+def continuation(network, x0, parameter, p_start, p_end, ds=0.1, ds_min=1e-6, ds_max=0.1, tol=1e-10,
+                 max_newton=8, max_steps=2000, max_correction=0.5, max_angle=np.pi / 6):
+    """ Follow the steady-state branch through x0 from p_start towards p_end
+
+    Pseudo-arclength continuation: each step predicts along the tangent of
+    the branch and corrects with Newton's method on the steady-state
+    equations plus the arclength condition, using the analytic Jacobian. A
+    step is rejected and retried with half of ds when Newton fails, when the
+    corrector moves more than max_correction * ds away from the prediction,
+    or when the tangent turns by more than max_angle (radians); both mean the
+    corrector may have jumped to another branch. ds grows up to ds_max when
+    Newton converges quickly, so the branch is followed around folds. It
+    stops when p passes p_end (the last point is solved at p_end), falls back
+    past p_start, ds falls below ds_min or after max_steps.
+
+    Along the branch it records whether each point is stable (all eigenvalues
+    of the free-node Jacobian have negative real part) and detects special
+    points between consecutive steps: 'fold' where the parameter component of
+    the tangent changes sign, 'branch' where the determinant of the augmented
+    Jacobian does, and 'hopf' where the number of unstable eigenvalues changes
+    by a complex pair while det(F_u) keeps its sign. Their parameter and state
+    are linearly interpolated between the two steps.
+
+    The eigenvalues and solves are dense, O(n_free**3) per step.
+    """
+    system = _ParameterSystem(network, parameter, x0)
+    direction = np.sign(p_end - p_start)
+    low, high = sorted((p_start, p_end))
+
+    u, converged, _ = system.newton(system.x0[system.free], p_start, tol, 50)
+    if not converged:
+        raise RuntimeError(f"Newton's method did not converge to a steady state at {parameter!r} = {p_start}")
+
+    p = p_start
+    jac_u = system.jacobian(u, p)
+    tangent = _tangent(jac_u, system.dparameter(u, p))
+    if tangent[-1] * direction < 0:
+        tangent = -tangent
+
+    parameters = [p]
+    states = [system.expand(u, p)]
+    stable = []
+    special_points = []
+    message = 'Reached the end of the parameter range'
+
+    eigenvalues = np.linalg.eigvals(jac_u)
+    stable.append(bool(np.all(eigenvalues.real < 0)))
+    tests = _test_functions(jac_u, system.dparameter(u, p), tangent, eigenvalues)
+
+    for _ in range(max_steps):
+        y = np.append(u, p)
+        while True:
+            y_pred = y + ds * tangent
+            y_new, converged, iterations = _correct(system, y_pred, tangent, tol, max_newton)
+            if converged and np.linalg.norm(y_new - y_pred) <= max_correction * ds:
+                u_new, p_new = y_new[:-1], y_new[-1]
+                jac_u = system.jacobian(u_new, p_new)
+                jac_p = system.dparameter(u_new, p_new)
+                new_tangent = _tangent(jac_u, jac_p, tangent)
+                if new_tangent @ tangent >= np.cos(max_angle):
+                    break
+            converged = False
+            ds /= 2
+            if ds < ds_min:
+                message = f'Step size fell below ds_min at {parameter!r} = {p}'
+                break
+        if not converged:
+            break
+
+        if (p_new - p_end) * direction > 0:
+            # Solve at p_end from the interpolated state
+            fraction = (p_end - p) / (p_new - p)
+            u_end, converged, _ = system.newton(u + fraction * (u_new - u), p_end, tol, 50)
+            if converged:
+                u_new, p_new = u_end, p_end
+                jac_u = system.jacobian(u_new, p_new)
+                jac_p = system.dparameter(u_new, p_new)
+                new_tangent = _tangent(jac_u, jac_p, tangent)
+            else:
+                message = f"Newton's method did not converge at {parameter!r} = {p_end}"
+        elif p_new < low or p_new > high:
+            message = 'The branch left the parameter range'
+
+        eigenvalues = np.linalg.eigvals(jac_u)
+        new_tests = _test_functions(jac_u, jac_p, new_tangent, eigenvalues)
+
+        index = len(parameters)
+        for kind in _detect(tests, new_tests):
+            fraction = _crossing(tests, new_tests, kind)
+            special_points.append(SpecialPoint(kind, index, p + fraction * (p_new - p),
+                                               system.expand(u + fraction * (u_new - u), p + fraction * (p_new - p))))
+
+        u, p, tangent, tests = u_new, p_new, new_tangent, new_tests
+        parameters.append(p)
+        states.append(system.expand(u, p))
+        stable.append(bool(np.all(eigenvalues.real < 0)))
+
+        if p == p_end or not (low <= p <= high) or message != 'Reached the end of the parameter range':
+            break
+        if iterations <= 3:
+            ds = min(ds * 1.5, ds_max)
+    else:
+        message = 'Reached max_steps'
+
+    return ContinuationResult(np.array(parameters), np.array(states), np.array(stable), special_points, message)
+
+def _correct(system, y_pred, tangent, tol, max_newton):
+    # Newton on F(u, p) = 0 and tangent . (y - y_pred) = 0
+    y = y_pred.copy()
+    for k in range(1, max_newton + 1):
+        u, p = y[:-1], y[-1]
+        residual = np.append(system.residual(u, p), tangent @ (y - y_pred))
+        matrix = np.vstack([np.column_stack([system.jacobian(u, p), system.dparameter(u, p)]), tangent])
+        try:
+            step = np.linalg.solve(matrix, -residual)
+        except np.linalg.LinAlgError:
+            return y, False, k
+        y = y + step
+        if np.max(np.abs(step)) < tol:
+            return y, True, k
+    return y, False, max_newton
+
+def _test_functions(jac_u, jac_p, tangent, eigenvalues):
+    augmented = np.vstack([np.column_stack([jac_u, jac_p]), tangent])
+    return {
+        'fold': tangent[-1],
+        'branch': np.linalg.det(augmented),
+        'det': np.linalg.det(jac_u),
+        'unstable': int(np.sum(eigenvalues.real > 0)),
+        'max_real': np.max(eigenvalues.real) if len(eigenvalues) else -np.inf,
+    }
+
+def _detect(old, new):
+    kinds = []
+    if np.sign(old['fold']) != np.sign(new['fold']):
+        kinds.append('fold')
+    if np.sign(old['branch']) != np.sign(new['branch']):
+        kinds.append('branch')
+    if np.sign(old['det']) == np.sign(new['det']) and abs(old['unstable'] - new['unstable']) == 2:
+        kinds.append('hopf')
+    return kinds
+
+def _crossing(old, new, kind):
+    # Fraction of the step at which the test function crosses zero
+    key = 'max_real' if kind == 'hopf' else kind
+    if new[key] == old[key]:
+        return 0.5
+    return float(np.clip(old[key] / (old[key] - new[key]), 0, 1))
+
+def parameter_sweep(network, x0, parameter, values, tol=1e-10, max_newton=8):
+    """ Steady state at every parameter value, each warm-started from the previous ones
+
+    The predictor extrapolates the last two solutions linearly in the
+    parameter and Newton's method with the analytic Jacobian corrects it, so
+    an ordered sweep costs a few solves per value. If Newton fails (for
+    example past a fold, where the branch ends) the steady state is found by
+    integrating from the predictor instead. Returns a SweepResult with the
+    states (n_values x n_nodes), per-value convergence and whether Newton's
+    method alone converged.
+    """
+    system = _ParameterSystem(network, parameter, x0)
+    values = np.asarray(values, dtype=float)
+    states = np.zeros((len(values), network.num_of_nodes))
+    converged = np.zeros(len(values), dtype=bool)
+    newton = np.zeros(len(values), dtype=bool)
+
+    u = system.x0[system.free]
+    for k, p in enumerate(values):
+        u_pred = u
+        if k >= 2 and values[k - 1] != values[k - 2]:
+            slope = (states[k - 1, system.free] - states[k - 2, system.free]) / (values[k - 1] - values[k - 2])
+            u_pred = u + slope * (p - values[k - 1])
+        try:
+            u, newton[k], _ = system.newton(u_pred, p, tol, max_newton)
+        except np.linalg.LinAlgError:
+            newton[k] = False
+        if newton[k]:
+            converged[k] = True
+        else:
+            result = steady_state(system.at(p), system.expand(np.clip(u_pred, 0, None), p), method='root')
+            u = result.x[system.free]
+            converged[k] = result.converged
+        states[k] = system.expand(u, p)
+    return SweepResult(values, states, converged, newton)
@@ -0,0 +1,143 @@
+""" Opt-in solver statistics, stage timers and memory high-water marks
+
+Nothing is recorded until enable() is called; until then stage() returns a
+shared no-op context manager and the solvers skip their bookkeeping after a
+single check of active(). Typical use:
+
+    recorder = instrumentation.enable()
+    with instrumentation.stage('simulate'):
+        ...
+    recorder.print_summary()
+    recorder.write('profile.json')  # or profile.csv
+"""
+import contextlib
+import csv
+import json
+import time
+
+import numpy as np
+
+_recorder = None
+_NULL_STAGE = contextlib.nullcontext()
+
+def max_rss_kb():
+    """ Peak resident set size of this process in kB, or None where getrusage is unavailable """
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class Recorder:
+    """ Collects per-integration solver statistics and per-stage wall times """
+
+    def __init__(self):
+        self.solver_stats = []
+        self.stages = {}
+
+    def record_solver(self, solver, **stats):
+        """ Add one integration's statistics (nfev, njev, nsteps, method_switches, ...) """
+        self.solver_stats.append({'solver': solver, **stats})
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+            entry['max_rss_kb'] = max_rss_kb()
+
+    def solver_totals(self):
+        """ Per-solver sums of every numeric statistic, plus the number of integrations """
+        totals = {}
+        for stats in self.solver_stats:
+            total = totals.setdefault(stats['solver'], {'integrations': 0})
+            total['integrations'] += 1
+            for key, value in stats.items():
+                if key != 'solver' and isinstance(value, (int, float, np.integer, np.floating)):
+                    total[key] = total.get(key, 0) + value
+        return totals
+
+    def as_dict(self):
+        return {'stages': self.stages, 'solver_totals': self.solver_totals(), 'solver_stats': self.solver_stats,
+                'max_rss_kb': max_rss_kb()}
+
+    def write(self, filename):
+        """ Write everything as JSON, or as CSV with one row per stage and per integration """
+        if filename.endswith('.csv'):
+            rows = [{'kind': 'stage', 'name': name, **entry} for name, entry in self.stages.items()]
+            rows += [{'kind': 'solver', 'name': stats['solver'], **stats} for stats in self.solver_stats]
+            fields = list(dict.fromkeys(key for row in rows for key in row if key != 'solver'))
+            with open(filename, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fields, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(filename, 'w') as f:
+                json.dump(self.as_dict(), f, indent=2, default=_to_json)
+
+    def print_summary(self):
+        print(f"{'stage':<30} {'calls':>6} {'seconds':>10} {'max RSS [MB]':>13}")
+        for name, entry in self.stages.items():
+            rss = entry.get('max_rss_kb')
+            rss = f'{rss / 1024:13.1f}' if rss is not None else f"{'-':>13}"
+            print(f"{name:<30} {entry['calls']:>6} {entry['seconds']:>10.3f} {rss}")
+        columns = ('integrations', 'n_samples', 'nfev', 'njev', 'nsteps', 'method_switches')
+        print()
+        print(f"{'solver':<12}" + ''.join(f'{column:>16}' for column in columns))
+        for solver, total in self.solver_totals().items():
+            print(f'{solver:<12}' + ''.join(f"{int(total[column]) if column in total else '-':>16}"
+                                            for column in columns))
+
+def enable():
+    """ Start recording into a new Recorder, which is returned """
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+def disable():
+    global _recorder
+    _recorder = None
+
+def active():
+    """ The current Recorder, or None when instrumentation is disabled """
+    return _recorder
+
+def report(filename=None):
+    """ Print the summary and, with a filename, write the recording; does nothing while disabled """
+    if _recorder is None:
+        return
+    _recorder.print_summary()
+    if filename:
+        _recorder.write(filename)
+        print(f'Instrumentation saved to {filename}')
+
+def stage(name):
+    """ Context manager timing a pipeline stage; a no-op while disabled """
+    if _recorder is None:
+        return _NULL_STAGE
+    return _recorder.stage(name)
+
+def odeint_stats(info, n_samples=1):
+    """ Statistics from the infodict of odeint(..., full_output=True)
+
+    LSODA reports the method in use only at the output times, so
+    method_switches counts switches between consecutive output times.
+    """
+    methods = info['mused']
+    return {
+        'n_samples': n_samples,
+        'nfev': int(info['nfe'][-1]),
+        'njev': int(info['nje'][-1]),
+        'nsteps': int(info['nst'][-1]),
+        'method_switches': int(np.count_nonzero(np.diff(methods))),
+        'final_method': 'adams' if methods[-1] == 1 else 'bdf',
+    }
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
@@ -0,0 +1,138 @@
+""" Load test of the simulation service: throughput and latency percentiles
+
+    python -m networkmodel.loadtest --requests 2000 --concurrency 32
+    python -m networkmodel.loadtest --port 8765 --no-spawn   # against a running service
+
+By default a service for --network is started in this process on a free
+loopback port. Each client keeps one connection open and sends clamp queries
+drawn from a pool of --distinct random single- and double-node clamps, so
+repeated queries exercise the cache.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+from .cli import NETWORK_FILE
+
+def query_pool(node_names, distinct, seed=0):
+    """ distinct random clamp queries of one or two nodes at level 0 or 1 """
+    rng = np.random.default_rng(seed)
+    pool = []
+    for _ in range(distinct):
+        nodes = rng.choice(len(node_names), rng.integers(1, 3), replace=False)
+        pool.append({'clamp': {node_names[i]: int(rng.integers(2)) for i in nodes}})
+    return pool
+
+async def _request(reader, writer, host, method, path, payload=None):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def _client(host, port, queries, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for query in queries:
+            start = time.perf_counter()
+            status, _ = await _request(reader, writer, host, 'POST', '/simulate', query)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def run_load(host, port, n_requests=1000, concurrency=16, distinct=100, seed=0):
+    """ Send n_requests queries from concurrency clients; returns the measurements """
+    reader, writer = await asyncio.open_connection(host, port)
+    _, nodes = await _request(reader, writer, host, 'GET', '/nodes')
+    pool = query_pool(nodes['nodes'], distinct, seed)
+    rng = np.random.default_rng(seed + 1)
+    queries = [pool[k] for k in rng.integers(len(pool), size=n_requests)]
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, queries[c::concurrency], latencies, errors)
+                           for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    _, stats = await _request(reader, writer, host, 'GET', '/stats')
+    writer.close()
+    await writer.wait_closed()
+
+    latencies = np.array(latencies)
+    return {
+        'requests': n_requests,
+        'concurrency': concurrency,
+        'distinct_queries': distinct,
+        'errors': len(errors),
+        'seconds': elapsed,
+        'throughput': n_requests / elapsed,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p90': float(np.percentile(latencies, 90)),
+        'latency_p99': float(np.percentile(latencies, 99)),
+        'latency_max': float(latencies.max()),
+        'service': stats,
+    }
+
+async def _spawn_and_run(args):
+    from .network import load_network
+    from .service import SimulationService
+
+    mact, minh, node_names, _, _ = load_network(args.network)
+    service = SimulationService(mact, minh, node_names, n_samples=args.samples, batch_window=args.batch_window)
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await run_load('127.0.0.1', port, args.requests, args.concurrency, args.distinct, args.seed)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--no-spawn', dest='spawn', action='store_false',
+                        help='test a service that is already running on --host/--port')
+    parser.add_argument('--network', default=NETWORK_FILE)
+    parser.add_argument('--samples', type=int, default=32, help='initial conditions per query of a spawned service')
+    parser.add_argument('--batch-window', type=float, default=0.005)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--distinct', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    if args.spawn:
+        report = asyncio.run(_spawn_and_run(args))
+    else:
+        report = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency, args.distinct,
+                                      args.seed))
+    service = report['service']
+    print(f"{report['requests']} requests, {report['concurrency']} clients, "
+          f"{report['distinct_queries']} distinct queries, {report['errors']} errors")
+    print(f"throughput {report['throughput']:.1f} req/s over {report['seconds']:.2f} s")
+    print(f"latency p50 {report['latency_p50'] * 1e3:.1f} ms, p90 {report['latency_p90'] * 1e3:.1f} ms, "
+          f"p99 {report['latency_p99'] * 1e3:.1f} ms, max {report['latency_max'] * 1e3:.1f} ms")
+    print(f"service: {service['cache_hits']} cache hits, {service['batches']} batches solving "
+          f"{service['solved']} queries in {service['solve_seconds']:.2f} s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import copy
+
+import numpy as np
+import scipy.sparse as sp
+
+def odesysfun(x, t, num_of_nodes, gamma, h, mact, minh, clamped):
+    f = np.zeros(num_of_nodes)
+    w = np.zeros(num_of_nodes)
+    h = np.broadcast_to(h, (num_of_nodes,))  # Scalar or per-node steepness
+
+    for i in range(num_of_nodes):
+        ract = mact[i, :]
+        rinh = minh[i, :]
+
+        if not np.any(rinh) and np.any(ract):
+            sum_alpha = np.sum(ract)
+            sum_alpha_x = np.dot(ract, x)
+            w[i] = ((1 + sum_alpha) / sum_alpha) * (sum_alpha_x / (1 + sum_alpha_x))
+
+        elif not np.any(ract) and np.any(rinh):
+            sum_beta = np.sum(rinh)
+            sum_beta_x = np.dot(rinh, x)
+            w[i] = 1 - ((1 + sum_beta) / sum_beta) * (sum_beta_x / (1 + sum_beta_x))
+
+        elif np.any(ract) and np.any(rinh):
+            sum_alpha = np.sum(ract)
+            sum_beta = np.sum(rinh)
+            sum_alpha_x = np.dot(ract, x)
+            sum_beta_x = np.dot(rinh, x)
+            w[i] = ((1 + sum_alpha) / sum_alpha) * (sum_alpha_x / (1 + sum_alpha_x)) * (1 - ((1 + sum_beta) / sum_beta) * (sum_beta_x / (1 + sum_beta_x)))
+
+        else:
+            w[i] = 0
+
+        f[i] = (-np.exp(0.5 * h[i]) + np.exp(-h[i] * (w[i] - 0.5))) / ((1 - np.exp(0.5 * h[i])) * (1 + np.exp(-h[i] * (w[i] - 0.5)))) - (gamma[i] * x[i])
+
+        if clamped[i] == 1:
+            f[i] = 0
+
+    return f
+
+class CompiledNetwork:
+    """ Mendoza right-hand side precompiled from the activation and inhibition matrices
+
+    Everything in odesysfun that does not depend on x (activator and inhibitor
+    counts, branch masks, normalisation constants, exp(0.5 * h)) is computed once
+    here, so a single evaluation is two matrix-vector products plus elementwise
+    operations.
+
+    gamma and h may be scalars, per-node arrays (n_nodes,) or, for stacked
+    ensembles, per-sample arrays (n_samples, n_nodes).
+
+    If mact or minh is a scipy.sparse matrix both are stored as CSR and the
+    right-hand side and Jacobian cost O(edges) instead of O(n_nodes**2); the
+    Jacobian is then returned as a sparse matrix.
+    """
+
+    def __init__(self, mact, minh, gamma, h, clamped=None):
+        self.sparse = sp.issparse(mact) or sp.issparse(minh)
+        if self.sparse:
+            self.mact = sp.csr_matrix(mact, dtype=float, copy=True)
+            self.minh = sp.csr_matrix(minh, dtype=float, copy=True)
+            for matrix in (self.mact, self.minh):
+                matrix.sum_duplicates()
+                matrix.eliminate_zeros()
+            has_act = np.diff(self.mact.indptr) > 0
+            has_inh = np.diff(self.minh.indptr) > 0
+            sum_alpha = np.asarray(self.mact.sum(axis=1)).ravel()
+            sum_beta = np.asarray(self.minh.sum(axis=1)).ravel()
+        else:
+            self.mact = np.asarray(mact, dtype=float)
+            self.minh = np.asarray(minh, dtype=float)
+            has_act = np.any(self.mact != 0, axis=1)
+            has_inh = np.any(self.minh != 0, axis=1)
+            sum_alpha = self.mact.sum(axis=1)
+            sum_beta = self.minh.sum(axis=1)
+        self.num_of_nodes = self.mact.shape[0]
+        self.gamma = np.asarray(gamma, dtype=float)
+
+        # (1 + sum) / sum for nodes with regulators, 0 otherwise. With a zero
+        # coefficient the activation term collapses to 1 and the inhibition
+        # term to 1, which reproduces every branch of odesysfun once w is
+        # masked to 0 for nodes without any regulator.
+        self.k_act = np.zeros(self.num_of_nodes)
+        self.k_act[has_act] = (1 + sum_alpha[has_act]) / sum_alpha[has_act]
+        self.k_inh = np.zeros(self.num_of_nodes)
+        self.k_inh[has_inh] = (1 + sum_beta[has_inh]) / sum_beta[has_inh]
+        self.no_act = (~has_act).astype(float)
+        self.has_any = (has_act | has_inh).astype(float)
+
+        # Nonzero pattern of the Jacobian: the network edges plus the decay
+        # term on the diagonal
+        if self.sparse:
+            self.jac_sparsity = (abs(self.mact) + abs(self.minh) + sp.eye(self.num_of_nodes)).tocsr() != 0
+            self._compile_sparse_jacobian()
+        else:
+            self.jac_sparsity = (self.mact != 0) | (self.minh != 0) | np.eye(self.num_of_nodes, dtype=bool)
+
+        self._set_steepness(h)
+        self.set_clamped(clamped)
+
+    def _compile_sparse_jacobian(self):
+        # Position of every activation, inhibition and diagonal entry inside
+        # the data array of the Jacobian pattern, so a Jacobian evaluation
+        # only fills one array of length nnz
+        pattern = self.jac_sparsity.tocsr()
+        pattern.sort_indices()
+        self._jac_indices = pattern.indices
+        self._jac_indptr = pattern.indptr
+        self._jac_rows = np.repeat(np.arange(self.num_of_nodes), np.diff(pattern.indptr))
+        lookup = sp.csr_matrix((np.arange(1, pattern.nnz + 1), pattern.indices, pattern.indptr),
+                               shape=pattern.shape)
+
+        def positions(rows, cols):
+            return np.asarray(lookup[rows, cols]).ravel() - 1
+
+        act = self.mact.tocoo()
+        inh = self.minh.tocoo()
+        diag = np.arange(self.num_of_nodes)
+        self._act_entries = (act.row, act.data, positions(act.row, act.col))
+        self._inh_entries = (inh.row, inh.data, positions(inh.row, inh.col))
+        self._diag_positions = positions(diag, diag)
+
+    def _set_steepness(self, h):
+        self.h = np.asarray(h, dtype=float)
+        self.exp_half_h = np.exp(0.5 * self.h)
+        self.sigmoid_norm = 1 / (1 - self.exp_half_h)
+
+    def with_parameters(self, gamma=None, h=None):
+        """ Copy of the network with new gamma and/or h, sharing the precomputed structure """
+        network = copy.copy(self)
+        if gamma is not None:
+            network.gamma = np.asarray(gamma, dtype=float)
+        if h is not None:
+            network._set_steepness(h)
+        return network
+
+    def take_samples(self, rows):
+        """ Copy of the network with the rows of per-sample gamma, h and clamps; shared ones are kept """
+        network = self.with_parameters(gamma=self.gamma[rows] if self.gamma.ndim == 2 else None,
+                                       h=self.h[rows] if self.h.ndim == 2 else None)
+        if self.clamped.ndim == 2:
+            network.set_clamped(self.clamped[rows])
+        return network
+
+    def set_clamped(self, clamped):
+        """ Set which nodes are held fixed (clamped == 1)
+
+        clamped is (n_nodes,) or, for stacked ensembles, one row per sample
+        (n_samples, n_nodes); the 'root' steady-state strategy and
+        continuation need a single row.
+        """
+        if clamped is None:
+            clamped = np.zeros(self.num_of_nodes)
+        self.clamped = np.array(clamped, dtype=float)
+        self.free = (self.clamped != 1).astype(float)
+
+    def activity(self, x):
+        """ Aggregated input w of every node for state x (n_nodes,) or (n_samples, n_nodes) """
+        _, _, act, inh = self._terms(x)
+        return act * inh * self.has_any
+
+    def _terms(self, x):
+        if self.sparse:
+            sum_alpha_x = (self.mact @ x.T).T
+            sum_beta_x = (self.minh @ x.T).T
+        else:
+            sum_alpha_x = x @ self.mact.T
+            sum_beta_x = x @ self.minh.T
+        act = self.k_act * (sum_alpha_x / (1 + sum_alpha_x)) + self.no_act
+        inh = 1 - self.k_inh * (sum_beta_x / (1 + sum_beta_x))
+        return sum_alpha_x, sum_beta_x, act, inh
+
+    def rhs(self, x, t=0):
+        """ Drop-in replacement for odesysfun with the signature odeint expects """
+        w = self.activity(x)
+        e = np.exp(-self.h * (w - 0.5))
+        f = (e - self.exp_half_h) * self.sigmoid_norm / (1 + e) - self.gamma * x
+        return f * self.free
+
+    __call__ = rhs
+
+    def jacobian(self, x, t=0):
+        """ Analytic Jacobian df/dx, (n_nodes, n_nodes) or (n_samples, n_nodes, n_nodes) for stacked x
+
+        With w = act * inh the chain rule gives
+        df_i/dx_j = S'(w_i) * (inh_i * k_act_i * mact_ij / (1 + sum_alpha_x_i)**2
+                               - act_i * k_inh_i * minh_ij / (1 + sum_beta_x_i)**2) - gamma_i * delta_ij
+        and clamped rows are zero. Entries outside jac_sparsity are always zero.
+        For a sparse network the result is a CSR matrix, block diagonal over
+        the samples for stacked x.
+        """
+        sum_alpha_x, sum_beta_x, act, inh = self._terms(x)
+        w = act * inh * self.has_any
+        e = np.exp(-self.h * (w - 0.5))
+        dsigmoid = -self.h * e * (1 + self.exp_half_h) * self.sigmoid_norm / (1 + e) ** 2
+
+        coef_act = dsigmoid * self.has_any * inh * self.k_act / (1 + sum_alpha_x) ** 2
+        coef_inh = dsigmoid * self.has_any * act * self.k_inh / (1 + sum_beta_x) ** 2
+        if self.sparse:
+            return self._sparse_jacobian(coef_act, coef_inh)
+        jac = coef_act[..., :, None] * self.mact - coef_inh[..., :, None] * self.minh
+        diag = np.arange(self.num_of_nodes)
+        jac[..., diag, diag] -= self.gamma
+        return jac * self.free[..., :, None]
+
+    def _sparse_jacobian(self, coef_act, coef_inh):
+        batch_shape = coef_act.shape[:-1]
+        nnz = len(self._jac_indices)
+        data = np.zeros(batch_shape + (nnz,))
+        rows, values, positions = self._act_entries
+        data[..., positions] += coef_act[..., rows] * values
+        rows, values, positions = self._inh_entries
+        data[..., positions] -= coef_inh[..., rows] * values
+        data[..., self._diag_positions] -= np.broadcast_to(self.gamma, coef_act.shape)
+        data *= np.broadcast_to(self.free, coef_act.shape)[..., self._jac_rows]
+
+        n = self.num_of_nodes
+        if not batch_shape:
+            return sp.csr_matrix((data, self._jac_indices, self._jac_indptr), shape=(n, n))
+        n_samples = batch_shape[0]
+        offsets = np.arange(n_samples)
+        indices = (self._jac_indices + n * offsets[:, None]).ravel()
+        indptr = np.append((self._jac_indptr[:-1] + nnz * offsets[:, None]).ravel(), n_samples * nnz)
+        return sp.csr_matrix((data.ravel(), indices, indptr), shape=(n * n_samples, n * n_samples))
+
+    def jac_ivp(self, t, x):
+        """ Jacobian with the argument order solve_ivp expects """
+        return self.jacobian(x, t)
+
+def check_jacobian(network, x, eps=1e-6):
+    """ Largest absolute difference between the analytic Jacobian and central finite differences at x """
+    x = np.asarray(x, dtype=float)
+    fd = np.zeros((network.num_of_nodes, network.num_of_nodes))
+    for j in range(network.num_of_nodes):
+        dx = np.zeros(network.num_of_nodes)
+        dx[j] = eps
+        fd[:, j] = (network.rhs(x + dx) - network.rhs(x - dx)) / (2 * eps)
+    jac = network.jacobian(x)
+    if sp.issparse(jac):
+        jac = jac.toarray()
+    return np.max(np.abs(jac - fd))
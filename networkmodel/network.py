@@ -0,0 +1,114 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+
+CACHE_VERSION = 1
+
+def file_hash(filename):
+    """ SHA-256 of a file's contents """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def parse_network(filename):
+    """ Read node names and activator/inhibitor edges from the network spreadsheet
+
+    Returns the node names, the stimuli names and the (target, source) index
+    pairs of the activating and inhibiting edges.
+    """
+    import pandas as pd
+
+    df = pd.read_excel(filename)
+    df.columns = [col.strip() for col in df.columns]  # Remove any leading/trailing spaces from column names
+
+    node_names = df['Nodes'].tolist()
+    stimuli_names = df['Stimuli'].tolist()
+    index = {}
+    for j, name in enumerate(stimuli_names):
+        index.setdefault(name, []).append(j)
+
+    # Entries are matched exactly as written, so a name with stray whitespace
+    # (or 'NOTHING') is not an edge, as in the original membership test
+    act_edges = []
+    inh_edges = []
+    for i in range(len(node_names)):
+        for name in set(str(df['Activators'][i]).split(',')):
+            act_edges.extend((i, j) for j in index.get(name, ()))
+        for name in set(str(df['Inhibitors'][i]).split(',')):
+            inh_edges.extend((i, j) for j in index.get(name, ()))
+
+    return node_names, stimuli_names, np.array(act_edges, dtype=np.int32).reshape(-1, 2), \
+        np.array(inh_edges, dtype=np.int32).reshape(-1, 2)
+
+def edges_to_matrix(edges, shape, sparse=False):
+    """ 0/1 matrix with ones at the (row, column) pairs in edges, dense or CSR """
+    if sparse:
+        return sp.csr_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=shape)
+    matrix = np.zeros(shape)
+    matrix[edges[:, 0], edges[:, 1]] = 1
+    return matrix
+
+def cache_filename(filename):
+    """ Path of the binary cache that sits next to the network spreadsheet """
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, f'.{name}.npz')
+
+def _read_cache(path, source_hash):
+    try:
+        with np.load(path) as cache:
+            if int(cache['version']) != CACHE_VERSION or str(cache['source_hash']) != source_hash:
+                return None
+            return (cache['node_names'].tolist(), cache['stimuli_names'].tolist(),
+                    cache['act_edges'], cache['inh_edges'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def _write_cache(path, source_hash, node_names, stimuli_names, act_edges, inh_edges):
+    # Write to a temporary file first so a concurrent reader never sees a
+    # partial cache; its name is unique to this writer, thread or process
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+                                         suffix='.tmp', delete=False) as f:
+            tmp = f.name
+            np.savez(f, version=CACHE_VERSION, source_hash=source_hash, node_names=np.array(node_names),
+                     stimuli_names=np.array(stimuli_names), act_edges=act_edges, inh_edges=inh_edges)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+def load_network(filename, use_cache=True, sparse=False):
+    """ Activation and inhibition matrices from the network spreadsheet
+
+    The parsed network is cached in a compact .npz next to the spreadsheet,
+    keyed by the SHA-256 of its contents. Later calls load the cache without
+    importing pandas; a cache whose hash does not match the current file is
+    rebuilt.
+
+    Returns mact, minh, node_names, num_of_nodes, stimuli_names like the
+    original create_matrices; with sparse the matrices are CSR.
+    """
+    source_hash = file_hash(filename)
+    path = cache_filename(filename)
+
+    parsed = _read_cache(path, source_hash) if use_cache else None
+    if parsed is None:
+        parsed = parse_network(filename)
+        if use_cache:
+            _write_cache(path, source_hash, *parsed)
+
+    node_names, stimuli_names, act_edges, inh_edges = parsed
+    num_of_nodes = len(node_names)
+    shape = (num_of_nodes, len(stimuli_names))
+    return edges_to_matrix(act_edges, shape, sparse), edges_to_matrix(inh_edges, shape, sparse), node_names, \
+        num_of_nodes, stimuli_names
+
+def create_matrices(filename):
+    """ Create activation and inhibition matrices from an Excel file """
+    return load_network(filename)
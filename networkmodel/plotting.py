@@ -0,0 +1,89 @@
+import os
+
+# Bar colours of the 32 SMENR1 nodes, grouped by function
+BASELINE_COLORS = [
+    [0.3010, 0.7450, 0.9330],
+    [0.3010, 0.7450, 0.9330],
+    [0.3010, 0.7450, 0.9330],
+    [0.3010, 0.7450, 0.9330],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 0, 0],
+    [1, 1, 1],
+    [1, 0, 1],
+    [1, 0, 1],
+    [0.4660, 0.6740, 0.1880],
+    [0.4660, 0.6740, 0.1880],
+    [0.4660, 0.6740, 0.1880],
+    [0.4660, 0.6740, 0.1880],
+    [0.4660, 0.6740, 0.1880],
+    [0.9290, 0.6940, 0.1250],
+    [0.9290, 0.6940, 0.1250],
+    [0.8500, 0.3250, 0.0980],
+    [0.8500, 0.3250, 0.0980],
+    [0.8500, 0.3250, 0.0980],
+    [0.8500, 0.3250, 0.0980],
+    [0.8500, 0.3250, 0.0980],
+    [0.8500, 0.3250, 0.0980],
+    [0.8500, 0.3250, 0.0980],
+    [0.4940, 0.1840, 0.5560],
+    [0.4940, 0.1840, 0.5560]
+]
+
+def pyplot(interactive=False):
+    """ matplotlib.pyplot, on the headless Agg backend unless interactive or MPLBACKEND is set """
+    import matplotlib
+    if not interactive and 'MPLBACKEND' not in os.environ:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def baseline_bar_plot(xbaseline, node_names, filename, colors=None):
+    plt = pyplot()
+    if colors is None and len(node_names) == len(BASELINE_COLORS):
+        colors = BASELINE_COLORS
+    plt.figure(figsize=(20, 8))  # Adjust the figure size to make it wider
+    plt.bar(range(len(xbaseline)), xbaseline, color=colors)
+    plt.xticks(range(len(node_names)), node_names, rotation=90, fontsize=14, fontweight='bold')
+    plt.title('Median Baseline', fontsize=14)
+    plt.xlabel('Responses', fontsize=14)
+    plt.ylabel('Activation Level', fontsize=14)
+    plt.ylim([0, 1.05])
+    plt.savefig(filename, bbox_inches='tight')  # Save plot to file
+    plt.close()
+
+def stimulus_bar_plot(xbaseline, xstimulated, node_names, title, filename):
+    plt = pyplot()
+    plt.figure(figsize=(20, 8))  # Adjust the figure size to make it wider
+    plt.bar(range(len(xbaseline)), xbaseline, 0.8, color=[0.3010, 0.7450, 0.9330])
+    plt.bar(range(len(xstimulated)), xstimulated, 0.3, color=[1, 1, 0])
+    plt.xticks(range(len(node_names)), node_names, rotation=90, fontsize=14, fontweight='bold')
+    plt.title(title, fontsize=14)
+    plt.xlabel('Responses', fontsize=14)
+    plt.ylabel('Activation Level', fontsize=14)
+    plt.ylim([1e-9, 1.2])
+    plt.yscale('log')
+    plt.savefig(filename, bbox_inches='tight')  # Save plot to file
+    plt.close()
+
+def trajectory_plot(time_points, trajectories, labels, filename=None, show=False):
+    """ One line per column of trajectories (n_time_points x n_species); saved to filename and/or shown """
+    plt = pyplot(interactive=show)
+    plt.figure(figsize=(10, 6))
+    for k, label in enumerate(labels):
+        plt.plot(time_points, trajectories[:, k], label=label)
+    plt.xlabel('Time')
+    plt.ylabel('Concentration')
+    plt.title('Simulation Results')
+    plt.legend()
+    if filename:
+        plt.savefig(filename, bbox_inches='tight')
+    if show:
+        plt.show()
+    plt.close()
@@ -0,0 +1,156 @@
+import json
+import time
+
+import numpy as np
+
+class ResultWriter:
+    """ Streams final states and trajectories into a chunked HDF5 file as they are produced
+
+    'final' holds one row per sample (n_samples x n_nodes) and 'trajectories'
+    one (n_time_points x n_nodes) block per sample; both grow as rows are
+    appended, so an ensemble or screen never has to be held in memory. Node
+    names, time points, parameters and clamps are stored with the data. A
+    clamp vector passed to the writer applies to every sample; per-sample
+    clamps can be appended alongside the states instead.
+    """
+
+    def __init__(self, filename, node_names, parameters=None, clamped=None, time_points=None,
+                 chunk_rows=1024, compression=None):
+        import h5py
+
+        self.file = h5py.File(filename, 'w')
+        self.num_of_nodes = len(node_names)
+        self.chunk_rows = chunk_rows
+        self.compression = compression
+
+        self.file.attrs['node_names'] = [str(name) for name in node_names]
+        self.file.attrs['parameters'] = json.dumps(parameters or {}, default=_to_json)
+        self.file.attrs['created'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        if clamped is not None:
+            self.file.attrs['clamped'] = np.asarray(clamped, dtype=float)
+        if time_points is not None:
+            self.file.create_dataset('time', data=np.asarray(time_points, dtype=float))
+
+    def _dataset(self, name, row_shape):
+        if name not in self.file:
+            chunk_rows = max(1, self.chunk_rows // int(np.prod(row_shape[:-1], dtype=int)))
+            self.file.create_dataset(name, shape=(0,) + row_shape, maxshape=(None,) + row_shape, dtype=float,
+                                     chunks=(chunk_rows,) + row_shape, compression=self.compression)
+        return self.file[name]
+
+    def _append(self, name, rows, row_shape):
+        rows = np.asarray(rows, dtype=float).reshape((-1,) + row_shape)
+        dataset = self._dataset(name, row_shape)
+        start = dataset.shape[0]
+        dataset.resize(start + len(rows), axis=0)
+        dataset[start:] = rows
+
+    def append_final(self, states, clamped=None):
+        """ Append final states, one row (n_nodes,) or several (n, n_nodes), with optional per-row clamps """
+        self._append('final', states, (self.num_of_nodes,))
+        if clamped is not None:
+            self._append('clamped', np.broadcast_to(clamped, np.shape(np.atleast_2d(states))),
+                         (self.num_of_nodes,))
+
+    def append_trajectories(self, trajectories):
+        """ Append trajectories, one (n_time_points, n_nodes) or several (n, n_time_points, n_nodes) """
+        trajectories = np.asarray(trajectories, dtype=float)
+        self._append('trajectories', trajectories, trajectories.shape[-2:])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ResultReader:
+    """ Reads a ResultWriter file lazily; statistics are computed one chunk or one column at a time """
+
+    def __init__(self, filename):
+        import h5py
+
+        self.file = h5py.File(filename, 'r')
+        self.node_names = [str(name) for name in self.file.attrs['node_names']]
+        self.parameters = json.loads(self.file.attrs['parameters'])
+        self.clamped = self.file.attrs.get('clamped')
+        self.time_points = self.file['time'][:] if 'time' in self.file else None
+
+    def __getitem__(self, name):
+        """ The h5py dataset ('final', 'trajectories' or 'clamped'); slicing reads only what is asked for """
+        return self.file[name]
+
+    def iter_chunks(self, name='final', time_index=None):
+        """ Yield the rows of a dataset block by block, following its HDF5 chunking """
+        dataset = self.file[name]
+        step = dataset.chunks[0] if dataset.chunks else 1024
+        for start in range(0, dataset.shape[0], step):
+            if time_index is None:
+                yield dataset[start:start + step]
+            else:
+                yield dataset[start:start + step, time_index]
+
+    def summary(self, name='final', time_index=-1, max_bytes=1 << 28):
+        """ Per-node count, mean, median and standard deviation of the final states
+
+        For 'trajectories' the statistics are of the states at time_index.
+        Mean and variance are merged chunk by chunk; the median needs whole
+        columns, so it is computed over as many node columns at a time as fit
+        in max_bytes (at least one).
+        """
+        index = time_index if name == 'trajectories' else None
+        count = 0
+        mean = np.zeros(len(self.node_names))
+        m2 = np.zeros(len(self.node_names))
+        for block in self.iter_chunks(name, index):
+            n = len(block)
+            block_mean = block.mean(axis=0)
+            delta = block_mean - mean
+            total = count + n
+            mean += delta * n / total
+            m2 += ((block - block_mean) ** 2).sum(axis=0) + delta ** 2 * count * n / total
+            count = total
+
+        median = np.full(len(mean), np.nan)
+        step = max(1, max_bytes // (8 * max(count, 1)))
+        for start in range(0, len(mean) if count else 0, step):
+            columns = slice(start, start + step)
+            median[columns] = np.median(self._columns(name, index, columns, count), axis=1)
+        std = np.sqrt(m2 / count) if count else np.full(len(mean), np.nan)
+        return {'count': count, 'mean': mean, 'median': median, 'std': std}
+
+    def _columns(self, name, time_index, columns, count):
+        # Node-major, so each median runs over contiguous memory
+        values = np.empty((len(range(*columns.indices(len(self.node_names)))), count))
+        start = 0
+        for block in self.iter_chunks(name, time_index):
+            values[:, start:start + len(block)] = block[:, columns].T
+            start += len(block)
+        return values
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def export_summary_excel(reader, filename, name='final'):
+    """ Write the mean/median/std summary of a result file to Excel, with node names as column headers """
+    import pandas as pd
+
+    stats = reader.summary(name)
+    table = pd.DataFrame([stats['mean'], stats['median'], stats['std']], index=['mean', 'median', 'std'],
+                         columns=reader.node_names)
+    table.to_excel(filename)
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
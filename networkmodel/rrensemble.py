@@ -0,0 +1,134 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+_worker = {}
+
+class RoadRunnerEnsemble:
+    """ Runs many initial conditions and clamp settings through one compiled RoadRunner model
+
+    The SBML is parsed and JIT-compiled once (or restored from a state file
+    written by saveState, which skips compilation). Each sample only resets
+    the model, sets initial concentrations and clamp_<species> parameters and
+    simulates. Columns of every input and output follow species_ids, which
+    defaults to the floating followed by the boundary species of the model.
+    Clamps need a model exported with sbmlgenerator's mode='rate_rules', which
+    is the default.
+    """
+
+    def __init__(self, sbml_file, species_ids=None, state_file=None):
+        import roadrunner
+
+        self.sbml_file = sbml_file
+        self.state_file = state_file
+        if state_file is not None and os.path.exists(state_file):
+            self.rr = roadrunner.RoadRunner()
+            self.rr.loadState(state_file)
+        else:
+            self.rr = roadrunner.RoadRunner(sbml_file)
+            if state_file is not None:
+                self.rr.saveState(state_file)
+
+        model = self.rr.model
+        floating = list(model.getFloatingSpeciesIds())
+        boundary = list(model.getBoundarySpeciesIds())
+        if species_ids is None:
+            species_ids = floating + boundary
+        self.species_ids = list(species_ids)
+
+        # Resolve the species-to-column and clamp-parameter mapping once
+        self._floating_cols = np.array([k for k, s in enumerate(self.species_ids) if s in floating], dtype=np.int32)
+        self._floating_idx = np.array([floating.index(self.species_ids[k]) for k in self._floating_cols], dtype=np.int32)
+        self._boundary_cols = np.array([k for k, s in enumerate(self.species_ids) if s in boundary], dtype=np.int32)
+        self._boundary_idx = np.array([boundary.index(self.species_ids[k]) for k in self._boundary_cols], dtype=np.int32)
+        parameters = list(model.getGlobalParameterIds())
+        clamp_ids = [f'clamp_{s}' for s in self.species_ids]
+        self._clamp_cols = np.array([k for k, p in enumerate(clamp_ids) if p in parameters], dtype=np.int32)
+        self._clamp_idx = np.array([parameters.index(clamp_ids[k]) for k in self._clamp_cols], dtype=np.int32)
+
+        self.rr.timeCourseSelections = ['time'] + [f'[{s}]' for s in self.species_ids]
+
+    def save_state(self, state_file):
+        """ Write the compiled model so other processes can restore it without recompiling """
+        self.rr.saveState(state_file)
+
+    def simulate_sample(self, xinit, clamped=None, t_start=0, t_end=30, num_points=100):
+        """ Trajectory (num_points, n_species) of one sample without recompiling the model """
+        model = self.rr.model
+        xinit = np.asarray(xinit, dtype=float)
+        if len(self._floating_cols):
+            model.setFloatingSpeciesInitConcentrations(self._floating_idx, xinit[self._floating_cols])
+        if len(self._boundary_cols):
+            model.setBoundarySpeciesInitConcentrations(self._boundary_idx, xinit[self._boundary_cols])
+        self.rr.reset()
+
+        clamped = np.zeros(len(self.species_ids)) if clamped is None else np.asarray(clamped, dtype=float)
+        missing = np.setdiff1d(np.flatnonzero(clamped), self._clamp_cols)
+        if len(missing):
+            raise ValueError(f"Model has no clamp parameter for {[self.species_ids[k] for k in missing]}")
+        if len(self._clamp_cols):
+            model.setGlobalParameterValues(self._clamp_idx, clamped[self._clamp_cols])
+
+        return np.array(self.rr.simulate(t_start, t_end, num_points))[:, 1:]
+
+    def run(self, xinit, clamped=None, t_start=0, t_end=30, num_points=100, final_only=True, processes=1,
+            cache=None):
+        """ Simulate every row of xinit (n_samples x n_species)
+
+        clamped is None, one clamp vector for all samples or one row per
+        sample. Returns the final states (n_samples x n_species), or the
+        trajectories (n_samples x num_points x n_species) without final_only.
+        With processes other than 1 the samples are split over a process pool
+        whose workers restore the compiled model from a saved state. With a
+        cache.ResultCache the results are looked up by the SBML file contents,
+        species, initial conditions, clamps and time grid.
+        """
+        xinit = np.atleast_2d(np.asarray(xinit, dtype=float))
+        if clamped is None:
+            clamped = np.zeros(len(self.species_ids))
+        clamped = np.broadcast_to(np.asarray(clamped, dtype=float), xinit.shape)
+        options = (t_start, t_end, num_points, final_only)
+
+        if cache is not None:
+            from .cache import cache_key
+            from .network import file_hash
+
+            key = cache_key('roadrunner_ensemble', file_hash(self.sbml_file), self.species_ids, xinit, clamped,
+                            *options)
+            return cache.cached(key, lambda: {'x': self.run(xinit, clamped, *options, processes)})['x']
+
+        if processes == 1:
+            return _simulate_chunk(self, xinit, clamped, *options)
+
+        workers = processes or os.cpu_count() or 1
+        chunks = np.array_split(np.arange(len(xinit)), min(workers, len(xinit)))
+        state_file = self.state_file
+        remove_state = state_file is None
+        if remove_state:
+            fd, state_file = tempfile.mkstemp(suffix='.rrstate')
+            os.close(fd)
+            self.save_state(state_file)
+        try:
+            initargs = (self.sbml_file, self.species_ids, state_file)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+                futures = [executor.submit(_run_worker_chunk, xinit[chunk], clamped[chunk], *options)
+                           for chunk in chunks]
+                return np.concatenate([future.result() for future in futures])
+        finally:
+            if remove_state:
+                os.remove(state_file)
+
+def _simulate_chunk(ensemble, xinit, clamped, t_start, t_end, num_points, final_only):
+    results = []
+    for x, clamp in zip(xinit, clamped):
+        trajectory = ensemble.simulate_sample(x, clamp, t_start, t_end, num_points)
+        results.append(trajectory[-1] if final_only else trajectory)
+    return np.stack(results)
+
+def _init_worker(sbml_file, species_ids, state_file):
+    _worker['ensemble'] = RoadRunnerEnsemble(sbml_file, species_ids, state_file)
+
+def _run_worker_chunk(xinit, clamped, t_start, t_end, num_points, final_only):
+    return _simulate_chunk(_worker['ensemble'], xinit, clamped, t_start, t_end, num_points, final_only)
@@ -0,0 +1,182 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy.stats import norm, qmc
+
+from .cache import cache_key, network_key
+from .ensemble import integrate_ensemble
+from .steadystate import steady_state
+
+AdaptiveResult = namedtuple('AdaptiveResult', ['x', 'mean', 'median', 'std', 'mean_halfwidth',
+                                               'median_halfwidth', 'converged', 'n_samples', 'n_unconverged'])
+
+SAMPLERS = ('random', 'sobol', 'lhs')
+
+class InitialConditionSampler:
+    """ Seeded batches of initial conditions in the unit cube, with clamped nodes set to clamp_value
+
+    'random' draws independent uniform points, 'lhs' an independent Latin
+    hypercube per batch and 'sobol' continues one scrambled Sobol sequence,
+    so consecutive batches fill the cube more evenly than random points.
+    """
+
+    def __init__(self, num_of_nodes, method='random', seed=None, clamped=None, clamp_value=1):
+        if method not in SAMPLERS:
+            raise ValueError(f"Unknown sampler '{method}', expected one of {SAMPLERS}")
+        self.num_of_nodes = num_of_nodes
+        self.method = method
+        self.clamped = None if clamped is None else np.asarray(clamped) == 1
+        self.clamp_value = clamp_value
+        if method == 'random':
+            self._rng = np.random.default_rng(seed)
+        elif method == 'sobol':
+            self._engine = qmc.Sobol(num_of_nodes, scramble=True, seed=seed)
+        else:
+            self._engine = qmc.LatinHypercube(num_of_nodes, seed=seed)
+
+    def draw(self, n_samples):
+        if self.method == 'random':
+            xinit = self._rng.random((n_samples, self.num_of_nodes))
+        else:
+            xinit = self._engine.random(n_samples)
+        if self.clamped is not None:
+            xinit[:, self.clamped] = self.clamp_value
+        return xinit
+
+class RunningStatistics:
+    """ Per-node mean, variance and median of a growing set of samples
+
+    Mean and variance are merged batch by batch (Chan et al.); the median and
+    its order-statistic confidence interval need the samples themselves, which
+    are kept as one (n_samples x n_nodes) array. Each of them selects order
+    statistics with np.partition, O(n_samples) per node rather than a sort,
+    so with batches that double the sample count their total cost stays
+    within a small factor of one pass over the final samples.
+    """
+
+    def __init__(self, num_of_nodes):
+        self.count = 0
+        self.mean = np.zeros(num_of_nodes)
+        self._m2 = np.zeros(num_of_nodes)
+        self._batches = []
+
+    def update(self, batch):
+        batch = np.atleast_2d(batch)
+        n = len(batch)
+        batch_mean = batch.mean(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + n
+        self.mean = self.mean + delta * n / total
+        self._m2 += ((batch - batch_mean) ** 2).sum(axis=0) + delta ** 2 * self.count * n / total
+        self.count = total
+        self._batches.append(batch)
+
+    @property
+    def samples(self):
+        if len(self._batches) > 1:
+            self._batches = [np.concatenate(self._batches)]
+        return self._batches[0]
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / max(self.count - 1, 1))
+
+    @property
+    def median(self):
+        return np.median(self.samples, axis=0)
+
+    def mean_halfwidth(self, confidence=0.95):
+        """ Half-width of the normal-approximation confidence interval of the mean """
+        return norm.ppf(0.5 + confidence / 2) * self.std / np.sqrt(self.count)
+
+    def median_halfwidth(self, confidence=0.95):
+        """ Half-width of the distribution-free order-statistic confidence interval of the median """
+        n = self.count
+        spread = norm.ppf(0.5 + confidence / 2) * np.sqrt(n) / 2
+        lower = max(int(np.floor(n / 2 - spread)), 0)
+        upper = min(int(np.ceil(n / 2 + spread)), n - 1)
+        ordered = np.partition(self.samples, [lower, upper], axis=0)
+        return (ordered[upper] - ordered[lower]) / 2
+
+def adaptive_ensemble(network, tol=1e-2, confidence=0.95, sampler='sobol', seed=None, batch_size=64,
+                      min_samples=64, max_samples=10000, t_end=None, steady_state_tol=1e-6, writer=None,
+                      cache=None):
+    """ Draw initial conditions in batches until the baseline statistics have converged
+
+    Every batch is run to its steady state (or integrated to t_end) as one
+    stacked system, and sampling stops once the confidence intervals of the
+    mean and of the median of every node are narrower than +-tol, or after
+    max_samples. Samples that do not reach a steady state are counted in
+    n_unconverged and left out of the states, the statistics and the writer.
+    Clamped nodes of the network start at 1. Sobol batches double the number
+    of samples so far, so every draw is a power of two (min_samples is
+    rounded up) and sampling stops at the largest power of two within
+    max_samples, keeping the sequence balanced; the intervals assume
+    independent samples and are conservative for Sobol and LHS points. With
+    a results.ResultWriter every batch is appended as it finishes. With a
+    cache.ResultCache and a seed, the result is looked up by the network,
+    its parameters and clamps and every sampling setting, and stored after
+    a miss.
+
+    Returns an AdaptiveResult with the converged final states, their
+    per-node mean, median and standard deviation, the interval half-widths,
+    whether tol was reached, the number of samples used and the number left
+    out because they did not converge.
+    """
+    if min_samples < 1 or max_samples < min_samples:
+        raise ValueError(f'Need 1 <= min_samples <= max_samples, got {min_samples} and {max_samples}')
+    if cache is not None and seed is not None:
+        key = cache_key('adaptive_ensemble/2', network_key(network), tol, confidence, sampler, seed, batch_size,
+                        min_samples, max_samples, t_end, steady_state_tol)
+        stored = cache.get(key)
+        if stored is not None:
+            if writer is not None:
+                writer.append_final(stored['x'], network.clamped)
+            return AdaptiveResult(*(stored[name] for name in AdaptiveResult._fields[:-3]),
+                                  bool(stored['converged']), int(stored['n_samples']), int(stored['n_unconverged']))
+        result = adaptive_ensemble(network, tol, confidence, sampler, seed, batch_size, min_samples, max_samples,
+                                   t_end, steady_state_tol, writer)
+        cache.put(key, **result._asdict())
+        return result
+
+    num_of_nodes = network.num_of_nodes
+    clamped = network.clamped if np.any(network.clamped) else None
+    draw = InitialConditionSampler(num_of_nodes, sampler, seed, clamped).draw
+    stats = RunningStatistics(num_of_nodes)
+
+    if sampler == 'sobol':
+        # Powers of two only: min_samples rounded up, max_samples rounded down
+        max_samples = 1 << (int(max_samples).bit_length() - 1)
+        min_samples = min(1 << (int(min_samples) - 1).bit_length(), max_samples)
+
+    converged = False
+    n_drawn = 0
+    n_unconverged = 0
+    n_next = min_samples
+    mean_halfwidth = median_halfwidth = np.full(num_of_nodes, np.inf)
+    while n_drawn + n_next <= max_samples or (sampler != 'sobol' and n_drawn < max_samples):
+        xinit = draw(min(n_next, max_samples - n_drawn))
+        n_drawn += len(xinit)
+        if t_end is None:
+            result = steady_state(network, xinit, tol=steady_state_tol)
+            xfinal = result.x[result.converged]
+            n_unconverged += int(np.sum(~result.converged))
+        else:
+            xfinal = integrate_ensemble(network, xinit, t_end)
+        if len(xfinal):
+            stats.update(xfinal)
+            if writer is not None:
+                writer.append_final(xfinal, network.clamped)
+
+        if stats.count > 1:
+            mean_halfwidth = stats.mean_halfwidth(confidence)
+            median_halfwidth = stats.median_halfwidth(confidence)
+            if np.all(mean_halfwidth < tol) and np.all(median_halfwidth < tol):
+                converged = True
+                break
+        n_next = n_drawn if sampler == 'sobol' else batch_size
+
+    samples = stats.samples if stats.count else np.zeros((0, num_of_nodes))
+    median = stats.median if stats.count else np.full(num_of_nodes, np.nan)
+    return AdaptiveResult(samples, stats.mean, median, stats.std, mean_halfwidth, median_halfwidth,
+                          converged, stats.count, n_unconverged)
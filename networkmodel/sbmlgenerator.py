@@ -0,0 +1,270 @@
+import numpy as np
+import libsbml
+
+def sanitize_id(name):
+    """ Sanitize identifiers to be valid SBML IDs """
+    return name.replace(' ', '_').replace('-', '_').replace('/', '_').replace('β', 'beta').replace('γ', 'gamma').replace('α', 'alpha')
+
+def define_units(model):
+    """ Define custom units for the model """
+    # Define unit for concentration
+    unit_def = model.createUnitDefinition()
+    unit_def.setId('concentration_unit')
+    unit = unit_def.createUnit()
+    unit.setKind(libsbml.UNIT_KIND_MOLE)
+    unit.setScale(-3)
+    unit.setExponent(1)
+    unit.setMultiplier(1)
+    
+    # Define unit for time
+    unit_def = model.createUnitDefinition()
+    unit_def.setId('time_unit')
+    unit = unit_def.createUnit()
+    unit.setKind(libsbml.UNIT_KIND_SECOND)
+    unit.setScale(0)
+    unit.setExponent(1)
+    unit.setMultiplier(1)
+    
+    # Define unit for rate constants (per second)
+    unit_def = model.createUnitDefinition()
+    unit_def.setId('rate_constant_unit')
+    unit = unit_def.createUnit()
+    unit.setKind(libsbml.UNIT_KIND_SECOND)
+    unit.setScale(0)
+    unit.setExponent(-1)
+    unit.setMultiplier(1)
+    
+    # Define unit for dimensionless parameters with a different id
+    unit_def = model.createUnitDefinition()
+    unit_def.setId('dimensionless_unit')
+    unit = unit_def.createUnit()
+    unit.setKind(libsbml.UNIT_KIND_DIMENSIONLESS)
+    unit.setScale(0)
+    unit.setExponent(1)
+    unit.setMultiplier(1)
+
+def add_model_annotation(model):
+    """ Add annotations to the SBML model """
+    model_history = libsbml.ModelHistory()
+
+    creator_1 = libsbml.ModelCreator()
+    creator_1.setGivenName("Sofia")
+    creator_1.setFamilyName("Tseranidou")
+    creator_1.setEmail("sofias@example.com")
+    creator_1.setOrganization("Institution")
+
+    creator_2 = libsbml.ModelCreator()
+    creator_2.setGivenName("Francis")
+    creator_2.setFamilyName("Chemorion")
+    creator_2.setEmail("francis@example.com")
+    creator_2.setOrganization("Institution")
+
+    model_history.addCreator(creator_1)
+    model_history.addCreator(creator_2)
+    
+    model.setModelHistory(model_history)
+
+    # Add additional metadata
+    model.setName("stseranidou2024")
+    model.setId("stseranidou2024")
+
+    notes = ("<body xmlns='http://www.w3.org/1999/xhtml'>"
+             "<p>ABSTRACT:</p>"
+             "<p>Intervertebral disc degeneration (IDD) arises from an intricate imbalance between the anabolic and catabolic processes governing the extracellular matrix (ECM) within the disc. "
+             "Biochemical processes are complex, redundant and feedback-looped, and improved integration of knowledge is needed. To addess this, a literature-based regulatory network model (RNM) for nucleus pulposus cells (NPC) is proposed, representing the normal state of the intervertebral disc (IVD), "
+             "in which proteins are represented by nodes that interact among each other through activation and/or inhibition edges. This model includes 32 different proteins and 150 edges by incorporating critical biochemical interactions in IVD regulation, "
+             "tested in vivo or vitro in humans’ and animals’ NPC, alongside non tissue specific protein-protein interactions. We used the network to calculate the dynamic regulation of each node through a semi-quantitative method. "
+             "The basal steady state successfully represented the activity of a normal NPC, and the model was assessed through the published literature, by replicating two independent experimental studies in human normal NPC. "
+             "Pro-catabolic or pro-anabolic shifts of the network activated by nodal perturbations could be predicted. Sensitivity analysis underscores the significant influence of transforming growth factor beta (TGF-β) and interleukin-1 receptor antagonist (IL-1Ra) "
+             "on the regulation of structural proteins and degrading enzymes within the system. Given the ongoing challenge of elucidating the mechanisms driving ECM degradation in IDD, this unique IVD RNM holds promise as a tool for exploring and predicting IDD progression, "
+             "shedding light on IVD phenotypes and guiding experimental research efforts.</p>"
+             "</body>")
+    
+    model.setNotes(notes)
+
+def _add_parameter(model, param_id, value, units, name):
+    param = model.createParameter()
+    param.setId(param_id)
+    param.setValue(float(value))
+    param.setConstant(True)
+    param.setUnits(units)
+    param.setName(name)
+    return param
+
+def _node_parameter_ids(model, prefix, values, node_ids, units, name):
+    """ One shared parameter if all nodes have the same value, otherwise one per node """
+    values = np.broadcast_to(np.asarray(values, dtype=float), (len(node_ids),))
+    if np.all(values == values[0]):
+        _add_parameter(model, prefix, values[0], units, name)
+        return [prefix] * len(node_ids)
+    for node_id, value in zip(node_ids, values):
+        _add_parameter(model, f'{prefix}_{node_id}', value, units, f'{name} {node_id}')
+    return [f'{prefix}_{node_id}' for node_id in node_ids]
+
+def _weighted_sum(weights, node_ids):
+    terms = [node_ids[j] if weights[j] == 1 else f'{float(weights[j])!r} * {node_ids[j]}'
+             for j in np.flatnonzero(weights)]
+    return '(' + ' + '.join(terms) + ')'
+
+def mendoza_assignment_rules(i, node_ids, mact, minh):
+    """ (variable, formula) assignment rules of node i: its activator and inhibitor sums and its input w_<node>
+
+    Each sum is emitted once and referenced by w_<node>, which the rate rule
+    references in turn. The per-node normalisation (1 + sum) / sum is folded
+    into a numeric constant.
+    """
+    mact = np.asarray(mact[i]).ravel()
+    minh = np.asarray(minh[i]).ravel()
+    target = node_ids[i]
+    rules = []
+    factors = []
+    if np.any(mact):
+        rules.append((f'act_{target}', _weighted_sum(mact, node_ids)))
+        factors.append(f'{float((1 + mact.sum()) / mact.sum())!r} * (act_{target} / (1 + act_{target}))')
+    if np.any(minh):
+        rules.append((f'inh_{target}', _weighted_sum(minh, node_ids)))
+        factors.append(f'(1 - {float((1 + minh.sum()) / minh.sum())!r} * (inh_{target} / (1 + inh_{target})))')
+    rules.append((f'w_{target}', ' * '.join(factors) if factors else '0'))
+    return rules
+
+def mendoza_rate_formula(target, gamma_id, h_id):
+    """ Rate rule of node target implementing the aggregated Mendoza equation of odesysfun
+
+    It references the input w_<target> of mendoza_assignment_rules, and the
+    clamp parameter of the node switches it off.
+    """
+    w = f'w_{target}'
+    return (f'(1 - clamp_{target}) * ((exp(-{h_id} * ({w} - 0.5)) - exp(0.5 * {h_id})) / '
+            f'((1 - exp(0.5 * {h_id})) * (1 + exp(-{h_id} * ({w} - 0.5)))) - {gamma_id} * {target})')
+
+def _parse(formula, variable):
+    math_ast = libsbml.parseFormula(formula)
+    if math_ast is None:
+        raise ValueError(f"Could not parse the rule for {variable}: {formula}")
+    return math_ast
+
+def export_to_sbml_with_params(filename, node_names, mact, minh, xinit, clamped, gamma, h, mode='rate_rules'):
+    """ Write the network as SBML
+
+    mode='rate_rules' (the default) writes one rate rule per node with the
+    exact Mendoza equation, its input sums and w_<node> as assignment rules,
+    gamma and h as shared (or per-node) parameters and a clamp_<node>
+    parameter per node, so clamps can be changed without rebuilding the
+    model; RoadRunnerEnsemble relies on that. mode='reactions' writes the
+    legacy model with one reaction per activating or inhibiting edge.
+    """
+    if mode not in ('reactions', 'rate_rules'):
+        raise ValueError(f"Unknown SBML export mode '{mode}'")
+
+    sbml_document = libsbml.SBMLDocument(2, 1)
+    model = sbml_document.createModel()
+    model.setId('stseranidou2024')
+    model.setName('stseranidou2024')
+    
+    # Define units
+    define_units(model)
+
+    compartment = model.createCompartment()
+    compartment.setId('default')
+    compartment.setConstant(True)
+    compartment.setSize(1.0)
+    compartment.setUnits('dimensionless_unit')
+    compartment.setName('Default Compartment')
+
+    sanitized_node_ids = [sanitize_id(node) for node in node_names]
+    if mode == 'rate_rules':
+        gamma_ids = _node_parameter_ids(model, 'gamma', gamma, sanitized_node_ids, 'rate_constant_unit', 'Decay Rate')
+        h_ids = _node_parameter_ids(model, 'h', h, sanitized_node_ids, 'dimensionless_unit', 'Steepness')
+        for i, node in enumerate(sanitized_node_ids):
+            _add_parameter(model, f'clamp_{node}', clamped[i], 'dimensionless_unit', f'Clamp {node}')
+    else:
+        _add_parameter(model, 'gamma', gamma, 'rate_constant_unit', 'Decay Rate')
+        _add_parameter(model, 'h', h, 'dimensionless_unit', 'Steepness')
+
+    for i, node in enumerate(sanitized_node_ids):
+        species = model.createSpecies()
+        species.setId(node)
+        species.setCompartment('default')
+        species.setInitialConcentration(xinit[i])
+        species.setBoundaryCondition(bool(clamped[i]))
+        species.setConstant(False)
+        species.setHasOnlySubstanceUnits(False)
+        species.setUnits('concentration_unit')
+        species.setName(node_names[i])
+
+    if mode == 'rate_rules':
+        # Level 2 Version 1 wants assignment rules before the rules that use
+        # them, so every sum precedes every w_<node>
+        assignments = [mendoza_assignment_rules(i, sanitized_node_ids, mact, minh)
+                       for i in range(len(sanitized_node_ids))]
+        ordered = [rule for rules in assignments for rule in rules[:-1]] + [rules[-1] for rules in assignments]
+        for variable, formula in ordered:
+            param = model.createParameter()
+            param.setId(variable)
+            param.setConstant(False)
+            param.setUnits('dimensionless_unit')
+            rule = model.createAssignmentRule()
+            rule.setVariable(variable)
+            rule.setMath(_parse(formula, variable))
+        for i, node in enumerate(sanitized_node_ids):
+            rule = model.createRateRule()
+            rule.setVariable(node)
+            rule.setMath(_parse(mendoza_rate_formula(node, gamma_ids[i], h_ids[i]), node))
+
+    # Add reactions
+    for i, target_node in enumerate(sanitized_node_ids if mode == 'reactions' else []):
+        for j, activator_node in enumerate(sanitized_node_ids):
+            if mact[j, i]:
+                reaction = model.createReaction()
+                reaction.setId(f"{activator_node}_activates_{target_node}")
+                reaction.setReversible(False)
+                reaction.setFast(False)
+                reactant = reaction.createReactant()
+                reactant.setSpecies(activator_node)
+                reactant.setStoichiometry(1)
+                reactant.setConstant(True)
+                product = reaction.createProduct()
+                product.setSpecies(target_node)
+                product.setStoichiometry(1)
+                product.setConstant(True)
+                kinetic_law = reaction.createKineticLaw()
+                formula = f"1 / (1 + exp(-h * ({activator_node} - 0.5))) - gamma * {target_node}"
+                math_ast = libsbml.parseFormula(formula)
+                kinetic_law.setMath(math_ast)
+                reaction.setKineticLaw(kinetic_law)
+
+        for j, inhibitor_node in enumerate(sanitized_node_ids):
+            if minh[j, i]:
+                reaction = model.createReaction()
+                reaction.setId(f"{inhibitor_node}_inhibits_{target_node}")
+                reaction.setReversible(False)
+                reaction.setFast(False)
+                reactant = reaction.createReactant()
+                reactant.setSpecies(inhibitor_node)
+                reactant.setStoichiometry(1)
+                reactant.setConstant(True)
+                product = reaction.createProduct()
+                product.setSpecies(target_node)
+                product.setStoichiometry(1)
+                product.setConstant(True)
+                kinetic_law = reaction.createKineticLaw()
+                formula = f"1 / (1 + exp(-h * ({inhibitor_node} - 0.5))) - gamma * {target_node}"
+                math_ast = libsbml.parseFormula(formula)
+                kinetic_law.setMath(math_ast)
+                reaction.setKineticLaw(kinetic_law)
+
+    # Add model annotations
+    add_model_annotation(model)
+
+    # Validate SBML document. Level 2 numbers cannot carry units, so every
+    # rule with a numeric constant only yields a 'cannot be fully checked'
+    # unit warning; units are declared on the species and parameters instead
+    sbml_document.setConsistencyChecks(libsbml.LIBSBML_CAT_UNITS_CONSISTENCY, False)
+    if sbml_document.checkConsistency():
+        for i in range(sbml_document.getNumErrors()):
+            print(sbml_document.getError(i).getMessage())
+    else:
+        print("SBML document is consistent")
+
+    # Write SBML file
+    libsbml.writeSBMLToFile(sbml_document, filename)
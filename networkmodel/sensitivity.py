@@ -0,0 +1,209 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import qmc
+
+from .mendoza import CompiledNetwork
+from .steadystate import newton_polish, steady_state
+
+MorrisResult = namedtuple('MorrisResult', ['parameter_names', 'mu', 'mu_star', 'sigma', 'n_dropped'])
+SobolResult = namedtuple('SobolResult', ['parameter_names', 'first_order', 'total_order', 'n_dropped', 'constant'])
+
+GAMMA_BOUNDS = (0.5, 1.5)
+H_BOUNDS = (5.0, 15.0)
+
+_worker = {}
+
+def parameter_names(node_names):
+    """ Names of the sensitivity parameters: gamma_i for every node followed by h_i """
+    return [f'gamma_{name}' for name in node_names] + [f'h_{name}' for name in node_names]
+
+def parameter_bounds(num_of_nodes, gamma_bounds=GAMMA_BOUNDS, h_bounds=H_BOUNDS):
+    """ Lower and upper bounds (2, 2 * n_nodes) matching parameter_names """
+    lower = np.concatenate((np.full(num_of_nodes, gamma_bounds[0]), np.full(num_of_nodes, h_bounds[0])))
+    upper = np.concatenate((np.full(num_of_nodes, gamma_bounds[1]), np.full(num_of_nodes, h_bounds[1])))
+    return np.vstack((lower, upper))
+
+def scale_design(design, bounds):
+    """ Map a design in the unit hypercube onto the parameter bounds """
+    return bounds[0] + design * (bounds[1] - bounds[0])
+
+def morris_design(num_params, n_trajectories, num_levels=4, seed=None):
+    """ Morris one-at-a-time trajectories in the unit hypercube
+
+    Returns the design (n_trajectories * (num_params + 1), num_params), the
+    parameter changed at every step (n_trajectories, num_params) and the signed
+    step taken (n_trajectories, num_params).
+    """
+    rng = np.random.default_rng(seed)
+    delta = num_levels / (2 * (num_levels - 1))
+    grid = np.arange(num_levels) / (num_levels - 1)
+
+    design = np.zeros((n_trajectories, num_params + 1, num_params))
+    order = np.zeros((n_trajectories, num_params), dtype=int)
+    steps = np.zeros((n_trajectories, num_params))
+    for r in range(n_trajectories):
+        x = rng.choice(grid, num_params)
+        order[r] = rng.permutation(num_params)
+        design[r, 0] = x
+        for k, param in enumerate(order[r]):
+            step = delta if x[param] + delta <= 1 else -delta
+            x = x.copy()
+            x[param] += step
+            steps[r, k] = step
+            design[r, k + 1] = x
+    return design.reshape(-1, num_params), order, steps
+
+def saltelli_design(num_params, n_base, seed=None):
+    """ Saltelli design [A; B; AB_1; ...; AB_d] (n_base * (num_params + 2), num_params) from a scrambled Sobol sequence """
+    sample = qmc.Sobol(2 * num_params, scramble=True, seed=seed).random(n_base)
+    a = sample[:, :num_params]
+    b = sample[:, num_params:]
+    blocks = [a, b]
+    for param in range(num_params):
+        ab = a.copy()
+        ab[:, param] = b[:, param]
+        blocks.append(ab)
+    return np.vstack(blocks)
+
+def _init_worker(mact, minh, xinit, clamped, tol):
+    _worker['network'] = CompiledNetwork(mact, minh, 1, 10, clamped)
+    _worker['xinit'] = xinit
+    _worker['tol'] = tol
+
+def _evaluate_batch(parameters):
+    network = _worker['network']
+    xinit = _worker['xinit']
+    num_of_nodes = network.num_of_nodes
+    n_rows, n_init = len(parameters), len(xinit)
+
+    # Every parameter row is run from every initial condition as one stacked system
+    gamma = np.repeat(parameters[:, :num_of_nodes], n_init, axis=0)
+    h = np.repeat(parameters[:, num_of_nodes:], n_init, axis=0)
+    batch = network.with_parameters(gamma=gamma, h=h)
+    result = steady_state(batch, np.tile(xinit, (n_rows, 1)), tol=_worker['tol'])
+    # The event stops at a residual of tol; Newton steps remove the remaining
+    # error along slow modes, which would otherwise show up as variance
+    x = newton_polish(batch, result.x)
+    # A row whose ensemble did not settle everywhere has no steady-state mean
+    converged = result.converged.reshape(n_rows, n_init).all(axis=1)
+    outputs = x.reshape(n_rows, n_init, num_of_nodes).mean(axis=1)
+    outputs[~converged] = np.nan
+    return outputs
+
+def evaluate_design(mact, minh, parameters, xinit, clamped=None, tol=1e-6, batch_size=64, processes=None):
+    """ Mean steady state over xinit for every parameter row (gamma_1..n, h_1..n)
+
+    Rows are evaluated batch_size at a time as one stacked ensemble, whose
+    steady states are polished by Newton steps, and the batches are spread
+    over a process pool; processes=1 evaluates in this
+    process. With clamped, xinit must already hold the clamp levels.
+    Returns an (n_rows, n_nodes) array, NaN in rows where any sample did not
+    reach a steady state.
+    """
+    xinit = np.atleast_2d(np.asarray(xinit, dtype=float))
+    batches = [parameters[start:start + batch_size] for start in range(0, len(parameters), batch_size)]
+    initargs = (mact, minh, xinit, clamped, tol)
+
+    if processes == 1:
+        _init_worker(*initargs)
+        outputs = [_evaluate_batch(batch) for batch in batches]
+    else:
+        workers = processes or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+            outputs = list(executor.map(_evaluate_batch, batches))
+    return np.concatenate(outputs)
+
+def morris_indices(outputs, order, steps):
+    """ Elementary effect statistics mu, mu* and sigma, each (num_params, n_outputs)
+
+    Trajectories with a NaN output (a point that did not reach a steady
+    state) are left out.
+    """
+    n_trajectories, num_params = order.shape
+    outputs = outputs.reshape(n_trajectories, num_params + 1, -1)
+    valid = ~np.isnan(outputs).any(axis=(1, 2))
+    effects = np.zeros((n_trajectories, num_params, outputs.shape[-1]))
+    for r in range(n_trajectories):
+        effects[r, order[r]] = np.diff(outputs[r], axis=0) / steps[r][:, None]
+    effects = effects[valid]
+    if not len(effects):
+        nan = np.full(effects.shape[1:], np.nan)
+        return nan, nan, nan
+    return effects.mean(axis=0), np.abs(effects).mean(axis=0), effects.std(axis=0, ddof=1)
+
+def sobol_indices(outputs, num_params, min_variance=0.0):
+    """ First-order (Saltelli 2010) and total-order (Jansen) indices, each (num_params, n_outputs)
+
+    Base samples with a NaN output in any of their A, B or AB_i rows are left
+    out. Outputs whose variance is not above min_variance get zero indices.
+    """
+    outputs = _valid_blocks(outputs, num_params)
+    f_a, f_b, f_ab = outputs[0], outputs[1], outputs[2:]
+    if not len(f_a):
+        nan = np.full((num_params, outputs.shape[-1]), np.nan)
+        return nan, nan
+
+    variance = _variance(outputs)
+    first = np.mean(f_b * (f_ab - f_a), axis=1)
+    total = 0.5 * np.mean((f_a - f_ab) ** 2, axis=1)
+    # Outputs that do not vary beyond the solver tolerance (e.g. clamped or
+    # saturated nodes) have no sensitivity, and dividing by their variance
+    # would only amplify solver noise
+    scale = np.divide(1, variance, out=np.zeros_like(variance), where=variance > min_variance)
+    return first * scale, total * scale
+
+def _valid_blocks(outputs, num_params):
+    # (num_params + 2, n_valid, n_outputs) blocks A, B, AB_i of the base
+    # samples without a NaN output
+    n_base = len(outputs) // (num_params + 2)
+    outputs = outputs.reshape(num_params + 2, n_base, -1)
+    return outputs[:, ~np.isnan(outputs).any(axis=(0, 2))]
+
+def _variance(blocks):
+    return np.var(np.concatenate((blocks[0], blocks[1])), axis=0)
+
+def morris_analysis(mact, minh, node_names, xinit, n_trajectories=20, num_levels=4, bounds=None,
+                    clamped=None, seed=None, batch_size=64, processes=None, tol=1e-6):
+    """ Morris screening of every per-node gamma_i and h_i on the steady state of every node
+
+    n_dropped counts the trajectories left out because a point did not
+    reach a steady state.
+    """
+    num_of_nodes = len(node_names)
+    if bounds is None:
+        bounds = parameter_bounds(num_of_nodes)
+    design, order, steps = morris_design(2 * num_of_nodes, n_trajectories, num_levels, seed)
+    outputs = evaluate_design(mact, minh, scale_design(design, bounds), xinit, clamped, tol=tol,
+                              batch_size=batch_size, processes=processes)
+    mu, mu_star, sigma = morris_indices(outputs, order, steps)
+    n_dropped = int(np.isnan(outputs).any(axis=1).reshape(n_trajectories, -1).any(axis=1).sum())
+    return MorrisResult(parameter_names(node_names), mu, mu_star, sigma, n_dropped)
+
+def sobol_analysis(mact, minh, node_names, xinit, n_base=256, bounds=None, clamped=None, seed=None,
+                   batch_size=64, processes=None, tol=1e-6, min_std=1e-9):
+    """ Sobol first- and total-order indices of every per-node gamma_i and h_i on the steady state of every node
+
+    Needs n_base * (2 * n_nodes + 2) model evaluations; n_base should be a
+    power of two. Base samples with any point that did not reach a steady
+    state are dropped (counted in n_dropped). The steady states are polished
+    by Newton steps, so only outputs whose standard deviation is below
+    min_std, far under the scale of nodes that settle near 1e-5, are treated
+    as constant: their indices are zero and they are flagged in constant
+    (n_outputs,). Outputs dominated by rare large values need a larger
+    n_base; total-order indices well above 1 are the sign of that.
+    """
+    num_of_nodes = len(node_names)
+    num_params = 2 * num_of_nodes
+    if bounds is None:
+        bounds = parameter_bounds(num_of_nodes)
+    design = saltelli_design(num_params, n_base, seed)
+    outputs = evaluate_design(mact, minh, scale_design(design, bounds), xinit, clamped, tol=tol,
+                              batch_size=batch_size, processes=processes)
+    first, total = sobol_indices(outputs, num_params, min_variance=min_std ** 2)
+    n_dropped = int(np.isnan(outputs).any(axis=1).reshape(num_params + 2, -1).any(axis=0).sum())
+    blocks = _valid_blocks(outputs, num_params)
+    constant = _variance(blocks) <= min_std ** 2 if blocks.shape[1] else np.ones(num_of_nodes, dtype=bool)
+    return SobolResult(parameter_names(node_names), first, total, n_dropped, constant)
@@ -0,0 +1,320 @@
+""" Local HTTP/JSON simulation service that keeps the compiled network warm
+
+    python -m networkmodel serve --port 8765
+
+POST /simulate with a JSON body such as
+
+    {"clamp": {"IL-1β": 1, "TNF": 0}, "gamma": 1.0, "h": {"IL-1β": 8}, "t_end": null}
+
+returns the per-node mean, median and standard deviation of the steady
+states (or of the states at t_end) over a fixed, seeded set of initial
+conditions, with clamped nodes held at the given level. gamma and h are a
+value for every node or {node: value} overrides of the defaults. GET
+/nodes lists the node names, GET /stats the request, batch and cache
+counters and GET /health answers ok.
+
+Queries arriving within batch_window seconds of each other are stacked
+into one ensemble solve with per-sample clamps, gamma and h, and recent
+results are kept in an LRU cache keyed by the clamps, parameters and t_end.
+The service only binds to loopback addresses.
+"""
+import asyncio
+import ipaddress
+import json
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+
+import numpy as np
+
+from .mendoza import CompiledNetwork
+from .sampling import InitialConditionSampler
+
+MAX_BODY = 1 << 20
+
+class QueryError(ValueError):
+    """ A query that cannot be simulated; answered with 400 Bad Request """
+
+def _is_number(value):
+    # JSON true and false arrive as bool, a subclass of int; NaN and Infinity
+    # are accepted by the json module but are no valid levels or parameters
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+
+class SimulationService:
+    """ Answers clamp/parameter queries from a network compiled once
+
+    backend='ode' integrates stacked CompiledNetwork ensembles;
+    backend='roadrunner' runs a RoadRunnerEnsemble of an SBML model exported
+    with mode='rate_rules', which keeps its gamma and h, so queries there
+    cannot override them and need a t_end (default_t_end).
+
+    Steady-state queries of a batch are solved together up to t_first; the
+    queries that have not settled by then are continued one at a time up to
+    t_max and reported as not converged if they still have not settled.
+    """
+
+    def __init__(self, mact, minh, node_names, gamma=1.0, h=10.0, n_samples=32, seed=0, tol=1e-6,
+                 batch_window=0.005, max_batch=64, cache_size=1024, backend='ode', sbml_file=None,
+                 default_t_end=100, t_first=20, t_max=1000):
+        if backend not in ('ode', 'roadrunner'):
+            raise ValueError(f"Unknown backend '{backend}'")
+        self.node_names = list(node_names)
+        self.index = {name: i for i, name in enumerate(self.node_names)}
+        self.num_of_nodes = len(self.node_names)
+        self.gamma = np.broadcast_to(np.asarray(gamma, dtype=float), (self.num_of_nodes,)).copy()
+        self.h = np.broadcast_to(np.asarray(h, dtype=float), (self.num_of_nodes,)).copy()
+        self.network = CompiledNetwork(mact, minh, self.gamma, self.h)
+        self.xinit = InitialConditionSampler(self.num_of_nodes, 'sobol', seed).draw(n_samples)
+        self.tol = tol
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self.backend = backend
+        self.default_t_end = default_t_end
+        self.t_first = t_first
+        self.t_max = t_max
+        self.ensemble = None
+        if backend == 'roadrunner':
+            from .rrensemble import RoadRunnerEnsemble
+            from .sbmlgenerator import sanitize_id
+            self.ensemble = RoadRunnerEnsemble(sbml_file, [sanitize_id(name) for name in self.node_names])
+
+        self._cache = OrderedDict()
+        self._queue = None
+        self.stats = {'requests': 0, 'cache_hits': 0, 'batches': 0, 'solved': 0, 'solve_seconds': 0.0}
+
+    def parse_query(self, query):
+        """ Validated (clamp levels, gamma, h, t_end) of a JSON query, and its cache key """
+        if not isinstance(query, dict):
+            raise QueryError('The query must be a JSON object')
+        unknown = set(query) - {'clamp', 'gamma', 'h', 't_end'}
+        if unknown:
+            raise QueryError(f'Unknown query fields {sorted(unknown)}')
+
+        clamps = query.get('clamp') or {}
+        if not isinstance(clamps, dict):
+            raise QueryError('clamp must be an object of node levels')
+        clamp = np.full(self.num_of_nodes, np.nan)
+        for name, level in clamps.items():
+            if name not in self.index:
+                raise QueryError(f"Unknown node '{name}'")
+            if not _is_number(level) or not 0 <= level <= 1:
+                raise QueryError(f"Clamp level of '{name}' must be a number between 0 and 1")
+            clamp[self.index[name]] = level
+        gamma = self._parameter(query, 'gamma', self.gamma)
+        h = self._parameter(query, 'h', self.h)
+        t_end = query.get('t_end')
+        if t_end is not None and (not _is_number(t_end) or t_end <= 0):
+            raise QueryError('t_end must be a positive number or null')
+        if self.backend == 'roadrunner':
+            if np.any(gamma != self.gamma) or np.any(h != self.h):
+                raise QueryError('The roadrunner backend cannot change gamma or h')
+            t_end = self.default_t_end if t_end is None else t_end
+
+        key = (clamp.tobytes(), gamma.tobytes(), h.tobytes(), t_end)
+        return (clamp, gamma, h, t_end), key
+
+    def _parameter(self, query, name, default):
+        value = query.get(name)
+        if value is None:
+            return default
+        if _is_number(value):
+            values = np.full(self.num_of_nodes, float(value))
+        elif isinstance(value, dict):
+            values = default.copy()
+            for node, node_value in value.items():
+                if node not in self.index or not _is_number(node_value):
+                    raise QueryError(f"Invalid {name} override for '{node}'")
+                values[self.index[node]] = node_value
+        else:
+            raise QueryError(f'{name} must be a number or an object of per-node values')
+        if np.any(values <= 0):
+            raise QueryError(f'{name} must be positive')
+        return values
+
+    async def simulate(self, query):
+        """ Result of one query, from the cache or from the next batch """
+        self.stats['requests'] += 1
+        spec, key = self.parse_query(query)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            return dict(self._cache[key], cached=True)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, spec, future))
+        return dict(await future, cached=False)
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Identical queries in one batch are solved once
+            unique = OrderedDict()
+            for key, spec, future in batch:
+                unique.setdefault(key, (spec, []))[1].append(future)
+            try:
+                results = await loop.run_in_executor(None, self.solve, [spec for spec, _ in unique.values()])
+            except Exception as e:
+                for _, futures in unique.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+
+            for (key, (_, futures)), result in zip(unique.items(), results):
+                self._cache[key] = result
+                self._cache.move_to_end(key)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(result)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def solve(self, specs):
+        """ Results of several (clamp, gamma, h, t_end) queries, stacked into one solve per t_end """
+        start = time.perf_counter()
+        results = [None] * len(specs)
+        groups = {}
+        for k, spec in enumerate(specs):
+            groups.setdefault(spec[3], []).append(k)
+        for t_end, members in groups.items():
+            xfinal, converged = self._solve_group([specs[k] for k in members], t_end)
+            for k, x, ok in zip(members, xfinal, converged):
+                results[k] = {
+                    'mean': x.mean(axis=0).tolist(),
+                    'median': np.median(x, axis=0).tolist(),
+                    'std': x.std(axis=0).tolist(),
+                    'samples': len(x),
+                    'converged': bool(ok),
+                }
+        self.stats['batches'] += 1
+        self.stats['solved'] += len(specs)
+        self.stats['solve_seconds'] += time.perf_counter() - start
+        return results
+
+    def _solve_group(self, specs, t_end):
+        from .ensemble import integrate_ensemble
+
+        n_samples = len(self.xinit)
+        clamp = np.repeat(np.array([spec[0] for spec in specs]), n_samples, axis=0)
+        clamped = ~np.isnan(clamp)
+        xinit = np.tile(self.xinit, (len(specs), 1))
+        xinit[clamped] = clamp[clamped]
+
+        if self.backend == 'roadrunner':
+            xfinal = self.ensemble.run(xinit, clamped.astype(float), t_end=t_end)
+            converged = np.ones(len(xinit), dtype=bool)
+        else:
+            gamma = np.repeat(np.array([spec[1] for spec in specs]), n_samples, axis=0)
+            h = np.repeat(np.array([spec[2] for spec in specs]), n_samples, axis=0)
+            network = self.network.with_parameters(gamma=gamma, h=h)
+            network.set_clamped(clamped.astype(float))
+            if t_end is None:
+                xfinal, converged = self._steady_states(network, xinit, len(specs), n_samples)
+            else:
+                xfinal = integrate_ensemble(network, xinit, t_end)
+                converged = np.ones(len(xinit), dtype=bool)
+
+        shape = (len(specs), n_samples)
+        return xfinal.reshape(shape + (self.num_of_nodes,)), converged.reshape(shape).all(axis=1)
+
+    def _steady_states(self, network, xinit, n_queries, n_samples):
+        from .steadystate import steady_state
+
+        # The stacked solve stops when every sample has settled, so one query
+        # that never settles would hold the whole batch until t_max. The batch
+        # is therefore only integrated to t_first; queries still moving then
+        # continue on their own, each costing at most its own solve to t_max
+        result = steady_state(network, xinit, tol=self.tol, t_max=self.t_first)
+        xfinal, converged = result.x, result.converged
+        for q in np.flatnonzero(~converged.reshape(n_queries, n_samples).all(axis=1)):
+            rows = slice(q * n_samples, (q + 1) * n_samples)
+            result = steady_state(network.take_samples(rows), xfinal[rows], tol=self.tol,
+                                  t_max=self.t_max - self.t_first)
+            xfinal[rows], converged[rows] = result.x, result.converged
+        return xfinal, converged
+
+    async def handle(self, reader, writer):
+        """ Serve HTTP/1.1 requests on one connection, keeping it alive between requests """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload = await self._route(method, path, body)
+                await self._respond(writer, status, payload)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if method == 'GET' and path == '/nodes':
+            return HTTPStatus.OK, {'nodes': self.node_names}
+        if method == 'GET' and path == '/stats':
+            return HTTPStatus.OK, dict(self.stats, cache_entries=len(self._cache))
+        if method == 'POST' and path == '/simulate':
+            try:
+                result = await self.simulate(json.loads(body or b'{}'))
+            except json.JSONDecodeError as e:
+                return HTTPStatus.BAD_REQUEST, {'error': f'Invalid JSON: {e}'}
+            except QueryError as e:
+                return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+            except Exception as e:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'{type(e).__name__}: {e}'}
+            return HTTPStatus.OK, dict(result, nodes=self.node_names)
+        return HTTPStatus.NOT_FOUND, {'error': f'No route for {method} {path}'}
+
+    async def _respond(self, writer, status, payload):
+        body = json.dumps(payload).encode()
+        writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """ Start the batcher and the server; returns the asyncio Server """
+        if not ipaddress.ip_address(host).is_loopback:
+            raise ValueError(f'The simulation service only binds to loopback addresses, not {host}')
+        self._queue = asyncio.Queue()
+        self._batcher_task = asyncio.create_task(self._batcher())
+        return await asyncio.start_server(self.handle, host, port)
+
+async def _serve_forever(service, host, port):
+    server = await service.start(host, port)
+    print(f'Serving {len(service.node_names)} nodes on http://{host}:{port} ({service.backend} backend)', flush=True)
+    async with server:
+        await server.serve_forever()
+
+def serve(service, host='127.0.0.1', port=8765):
+    """ Run the service until interrupted """
+    try:
+        asyncio.run(_serve_forever(service, host, port))
+    except KeyboardInterrupt:
+        pass
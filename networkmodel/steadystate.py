@@ -0,0 +1,166 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy.integrate import solve_ivp
+from scipy.optimize import root
+
+from . import instrumentation
+from .ensemble import integrate_ensemble
+
+SteadyStateResult = namedtuple('SteadyStateResult', ['x', 'converged', 'nfev', 'residual'])
+
+class _CountingNetwork:
+    """ Wraps a CompiledNetwork and counts right-hand side evaluations """
+
+    def __init__(self, network, parent=None):
+        self.network = network
+        self.parent = parent
+        self.nfev = 0
+
+    def rhs(self, x, t=0):
+        self.nfev += 1
+        if self.parent is not None:
+            self.parent.nfev += 1
+        return self.network.rhs(x, t)
+
+    def take_samples(self, rows):
+        # Evaluations of the chunk count towards this counter
+        return _CountingNetwork(self.network.take_samples(rows), self)
+
+    def __getattr__(self, name):
+        return getattr(self.network, name)
+
+def steady_state(network, xinit, method='event', tol=1e-6, t_max=1000, t_warm=2):
+    """ Steady state of the network from xinit (n_nodes,) or (n_samples, n_nodes)
+
+    method='event' integrates until the max norm of f(x) over all samples
+    falls below tol, or until t_max. method='root' integrates for t_warm to
+    get into the basin of a steady state and then solves f(x) = 0 for the
+    free (unclamped) nodes with a hybrid Powell root finder using the analytic
+    Jacobian; clamped nodes keep their initial value.
+
+    Returns a SteadyStateResult with the states, a per-sample converged flag,
+    the number of right-hand side evaluations (of the stacked system for
+    'event', summed over samples for 'root') and the per-sample max norm of
+    f at the returned state.
+
+    For sparse networks the event strategy takes explicit RK45 steps, whose
+    cost is O(edges) but whose accuracy near the steady state is limited by
+    stability, so tight tolerances may not be reached; the root strategy then
+    warm-starts by integrating until the residual is below 1e-2 and finishes
+    with a matrix-free Newton-Krylov solve.
+    """
+    xinit = np.asarray(xinit, dtype=float)
+    single = xinit.ndim == 1
+    xinit = np.atleast_2d(xinit)
+
+    if method == 'event':
+        x, nfev, settled = _steady_state_event(network, xinit, tol, t_max)
+    elif method == 'root':
+        x, nfev = _steady_state_root(network, xinit, tol, t_warm, t_max)
+    else:
+        raise ValueError(f"Unknown steady state method '{method}'")
+
+    residual = np.max(np.abs(network.rhs(x)), axis=1)
+    if method == 'event':
+        # The event fires where the norm crosses tol, up to root-finding accuracy
+        converged = settled | (residual <= tol)
+    else:
+        converged = residual < tol
+    recorder = instrumentation.active()
+    if recorder is not None:
+        recorder.record_solver(f'steady_{method}', n_samples=len(x), nfev=nfev, converged=int(np.sum(converged)))
+    if single:
+        return SteadyStateResult(x[0], converged[0], nfev, residual[0])
+    return SteadyStateResult(x, converged, nfev, residual)
+
+def _steady_state_event(network, xinit, tol, t_max, rtol=1e-6):
+    n_samples, num_of_nodes = xinit.shape
+    counter = _CountingNetwork(network)
+
+    def stacked_rhs(t, y):
+        return counter.rhs(y.reshape(n_samples, num_of_nodes), t).ravel()
+
+    def settled(t, y):
+        return np.max(np.abs(stacked_rhs(t, y))) - tol
+
+    settled.terminal = True
+    settled.direction = -1
+
+    if network.sparse:
+        # LSODA's banded workspace grows with n_nodes**2, so large sparse
+        # networks take explicit steps that cost O(edges) (see integrate_ensemble)
+        options = {'method': 'RK45', 'rtol': rtol, 'atol': 1e-2 * tol}
+    else:
+        options = {'method': 'LSODA', 'lband': num_of_nodes - 1, 'uband': num_of_nodes - 1}
+    sol = solve_ivp(stacked_rhs, (0, t_max), xinit.ravel(), events=settled, **options)
+    if sol.status == -1:
+        raise RuntimeError(f"Steady state integration failed: {sol.message}")
+    return sol.y[:, -1].reshape(n_samples, num_of_nodes), counter.nfev, sol.status == 1
+
+def _steady_state_root(network, xinit, tol, t_warm, t_max, warm_tol=1e-2):
+    if network.sparse:
+        xwarm, nfev, _ = _steady_state_event(network, xinit, warm_tol, t_max, rtol=1e-4)
+        nfev *= len(xinit)
+    else:
+        counter = _CountingNetwork(network)
+        xwarm = xinit
+        if t_warm > 0:
+            xwarm = integrate_ensemble(counter, xinit, t_warm)
+        nfev = counter.nfev * len(xinit)
+
+    # Clamped rows of f and of the Jacobian are identically zero, so the
+    # system is only solved for the free nodes
+    free = np.flatnonzero(network.free)
+    x = xwarm.copy()
+    for k, x0 in enumerate(xwarm):
+        def residual(xfree):
+            xfull = x0.copy()
+            xfull[free] = xfree
+            return network.rhs(xfull)[free]
+
+        def jacobian(xfree):
+            xfull = x0.copy()
+            xfull[free] = xfree
+            return network.jacobian(xfull)[np.ix_(free, free)]
+
+        if network.sparse:
+            # MINPACK's hybrid method factorises dense matrices and sparse LU
+            # fills in badly on hub-dominated networks, so use Newton-Krylov
+            sol = root(residual, x0[free], method='krylov', options={'fatol': tol * 1e-2, 'maxiter': 50})
+            nfev += sol.get('nfev', sol.nit)
+        else:
+            sol = root(residual, x0[free], jac=jacobian, method='hybr', options={'xtol': tol * 1e-2})
+            nfev += sol.nfev
+        if np.max(np.abs(sol.fun)) < np.max(np.abs(residual(x0[free]))):
+            x[k, free] = sol.x
+    return x, nfev
+
+def newton_polish(network, x, max_iter=2):
+    """ Steady states x (n_samples, n_nodes) refined by Newton steps with the analytic Jacobian
+
+    Integration stops once the residual is below tol, which along slow modes
+    leaves the state itself much less accurate; a couple of Newton steps
+    from there bring it to near machine precision. A step is only kept for
+    the samples whose residual it reduces, so states that were not near a
+    steady state are left as they are. Sparse networks are returned as is.
+    """
+    x = np.array(x, dtype=float)
+    if network.sparse:
+        return x
+    diag = np.arange(network.num_of_nodes)
+    with np.errstate(over='ignore', invalid='ignore'):
+        residual = np.max(np.abs(network.rhs(x)), axis=-1)
+        for _ in range(max_iter):
+            # Clamped rows of the Jacobian are zero; a unit diagonal keeps them fixed
+            jac = network.jacobian(x)
+            jac[..., diag, diag] += 1 - network.free
+            try:
+                candidate = x - np.linalg.solve(jac, network.rhs(x)[..., None])[..., 0]
+            except np.linalg.LinAlgError:
+                break
+            new_residual = np.max(np.abs(network.rhs(candidate)), axis=-1)
+            better = new_residual < residual
+            x[better] = candidate[better]
+            residual = np.where(better, new_residual, residual)
+    return x
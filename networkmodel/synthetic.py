@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from .mendoza import CompiledNetwork
+
+def scale_free_network(num_of_nodes, edges_per_node=3, inhibition_fraction=0.3, seed=None):
+    """ Random scale-free regulatory network grown by preferential attachment
+
+    Every new node attaches to edges_per_node distinct existing nodes chosen
+    with probability proportional to their degree (Barabasi-Albert). Each edge
+    gets a random direction and is inhibiting with probability
+    inhibition_fraction. Returns CSR mact, minh (target x source) and node
+    names, ready for CompiledNetwork.
+    """
+    rng = np.random.default_rng(seed)
+    m = min(edges_per_node, num_of_nodes - 1)
+
+    sources = []
+    targets = []
+    # Every node appears in this list once per incident edge, so a uniform
+    # draw from it is a draw proportional to degree
+    degree_list = list(range(m))
+    for new in range(m, num_of_nodes):
+        chosen = set()
+        while len(chosen) < m:
+            chosen.add(degree_list[rng.integers(len(degree_list))])
+        for old in chosen:
+            if rng.random() < 0.5:
+                sources.append(new)
+                targets.append(old)
+            else:
+                sources.append(old)
+                targets.append(new)
+            degree_list.extend((new, old))
+
+    sources = np.array(sources)
+    targets = np.array(targets)
+    inhibiting = rng.random(len(sources)) < inhibition_fraction
+    shape = (num_of_nodes, num_of_nodes)
+    mact = sp.csr_matrix((np.ones((~inhibiting).sum()), (targets[~inhibiting], sources[~inhibiting])), shape=shape)
+    minh = sp.csr_matrix((np.ones(inhibiting.sum()), (targets[inhibiting], sources[inhibiting])), shape=shape)
+    node_names = [f'N{i}' for i in range(num_of_nodes)]
+    return mact, minh, node_names
+
+def _best_time(function, repeats):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def rhs_scaling(sizes=(32, 128, 512, 1000, 2000, 5000), edges_per_node=3, repeats=20, seed=0):
+    """ Best-of-repeats time of one sparse right-hand side and Jacobian evaluation per network size """
+    rows = []
+    for num_of_nodes in sizes:
+        mact, minh, _ = scale_free_network(num_of_nodes, edges_per_node, seed=seed)
+        network = CompiledNetwork(mact, minh, np.ones(num_of_nodes), 10)
+        x = np.random.default_rng(seed).random(num_of_nodes)
+        rows.append({
+            'nodes': num_of_nodes,
+            'edges': mact.nnz + minh.nnz,
+            'rhs_seconds': _best_time(lambda: network.rhs(x), repeats),
+            'jacobian_seconds': _best_time(lambda: network.jacobian(x), repeats),
+        })
+    return rows
+
+if __name__ == '__main__':
+    print(f"{'nodes':>8} {'edges':>8} {'rhs [us]':>10} {'jac [us]':>10} {'rhs ns/edge':>12}")
+    for row in rhs_scaling():
+        print(f"{row['nodes']:>8} {row['edges']:>8} {row['rhs_seconds'] * 1e6:>10.1f} "
+              f"{row['jacobian_seconds'] * 1e6:>10.1f} {row['rhs_seconds'] / row['edges'] * 1e9:>12.1f}")
@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NETWORK_FILE = os.path.join(ROOT, 'SMENR1.xlsx')
+
+def random_network(num_of_nodes=8, density=0.3, seed=0):
+    """ Dense random mact, minh with disjoint activating and inhibiting edges """
+    rng = np.random.default_rng(seed)
+    edges = rng.random((num_of_nodes, num_of_nodes)) < density
+    inhibiting = rng.random((num_of_nodes, num_of_nodes)) < 0.3
+    return (edges & ~inhibiting).astype(float), (edges & inhibiting).astype(float)
+
+@pytest.fixture
+def small_network():
+    return random_network()
+
+@pytest.fixture
+def acyclic_network(small_network):
+    """ small_network with only the edges from lower to higher nodes, so every sample settles """
+    return tuple(np.tril(m, -1) for m in small_network)
+
+@pytest.fixture
+def inhibition_ring():
+    """ Three nodes each inhibiting the next; the ring oscillates and never settles """
+    return np.zeros((3, 3)), np.roll(np.eye(3), 1, axis=1)
+
+@pytest.fixture
+def toggle_switch():
+    """ Two mutually inhibiting nodes, bistable with symmetric basins """
+    return np.zeros((2, 2)), np.array([[0.0, 1.0], [1.0, 0.0]])
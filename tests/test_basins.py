@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from networkmodel.basins import AttractorIndex, basin_analysis
+from networkmodel.mendoza import CompiledNetwork
+
+def test_toggle_switch_has_two_symmetric_basins(toggle_switch):
+    network = CompiledNetwork(*toggle_switch, 1.0, 10.0)
+    result = basin_analysis(network, tol=0.05, seed=0)
+
+    stable = result.max_eigenvalues < 0
+    assert stable.sum() == 2
+    # One node high and the other low, each way round
+    high = np.sort(np.argmax(result.attractors[stable], axis=1))
+    np.testing.assert_array_equal(high, [0, 1])
+    np.testing.assert_allclose(result.fractions[stable], 0.5, atol=0.05)
+    assert result.converged and result.n_unsettled == 0
+    assert result.counts.sum() == result.n_samples
+
+@pytest.mark.parametrize('max_samples', [300, 1000])
+def test_sobol_batches_stay_powers_of_two(toggle_switch, max_samples):
+    network = CompiledNetwork(*toggle_switch, 1.0, 10.0)
+    result = basin_analysis(network, tol=1e-6, seed=0, min_samples=100, max_samples=max_samples)
+
+    assert not result.converged
+    assert result.n_samples == 1 << (max_samples.bit_length() - 1)
+
+def test_limit_cycle_samples_are_unsettled(inhibition_ring):
+    network = CompiledNetwork(*inhibition_ring, 1.0, 10.0)
+    result = basin_analysis(network, seed=0, min_samples=4, max_samples=4, t_max=50)
+
+    assert result.n_unsettled == 4
+    assert result.counts.sum() == 0
+
+def test_attractor_index_merges_states_within_tol(toggle_switch):
+    index = AttractorIndex(CompiledNetwork(*toggle_switch, 1.0, 10.0), tol=1e-3)
+    labels = index.add(np.array([[1.0, 0.0], [1.0, 5e-4], [0.0, 1.0]]))
+
+    np.testing.assert_array_equal(labels, [0, 0, 1])
+    assert len(index) == 2
+    np.testing.assert_array_equal(index.lookup([[0.0, 1.0 + 5e-4], [0.5, 0.5]]), [1, -1])
@@ -0,0 +1,32 @@
+import numpy as np
+
+from networkmodel.boolean import BooleanNetwork, pack_states, unpack_states
+from networkmodel.mendoza import CompiledNetwork
+
+def test_update_is_the_thresholded_activity(small_network):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    boolean = BooleanNetwork(*small_network)
+    states = boolean.state_space()
+
+    expected = pack_states(network.activity(unpack_states(states, network.num_of_nodes)))
+    np.testing.assert_array_equal(boolean.update(states), expected)
+
+def test_toggle_switch_attractors(toggle_switch):
+    # Two fixed points, and a synchronous 00 <-> 11 cycle that the
+    # asynchronous dynamics leave
+    boolean = BooleanNetwork(*toggle_switch)
+
+    synchronous = {tuple(a.states) for a in boolean.attractors()}
+    assert synchronous == {(1,), (2,), (0, 3)}
+    asynchronous = boolean.async_attractors()
+    assert {tuple(a.states) for a in asynchronous} == {(1,), (2,)}
+    # 00 and 11 reach both fixed points
+    assert [a.basin_size for a in asynchronous] == [3, 3]
+
+def test_inhibition_ring_has_a_cyclic_async_attractor(inhibition_ring):
+    boolean = BooleanNetwork(*inhibition_ring)
+
+    attractors = boolean.async_attractors()
+    assert len(attractors) == 1
+    assert len(attractors[0].states) == 6
+    assert not len(boolean.fixed_points())
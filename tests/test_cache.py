@@ -0,0 +1,47 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from networkmodel.cache import ResultCache, cache_key, network_key
+from networkmodel.mendoza import CompiledNetwork
+
+def test_keys_depend_on_every_part(small_network):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    key = cache_key(network_key(network), 1e-6, 'sobol')
+
+    assert cache_key(network_key(network), 1e-6, 'sobol') == key
+    assert cache_key(network_key(network.with_parameters(h=11.0)), 1e-6, 'sobol') != key
+    assert cache_key(network_key(network), 1e-7, 'sobol') != key
+    # Sparse matrices are hashed in canonical CSR form
+    duplicated = sp.coo_matrix(([1.0, 1.0, 3.0], ([0, 0, 1], [1, 1, 0])), shape=(2, 2))
+    assert cache_key(duplicated) == cache_key(sp.csr_matrix([[0, 2.0], [3.0, 0]]))
+    assert cache_key(None) != cache_key(0) != cache_key(False) != cache_key('')
+
+def test_large_integers_do_not_collide():
+    assert cache_key(2 ** 53) != cache_key(2 ** 53 + 1)
+    assert cache_key(np.int64(2 ** 62)) != cache_key(np.int64(2 ** 62 + 1))
+    assert cache_key(np.array([2 ** 53])) != cache_key(np.array([2 ** 53 + 1]))
+    assert cache_key(3) == cache_key(np.int32(3))
+    assert cache_key(3) != cache_key(3.0)
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = cache_key('entry')
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda k: cache.put(key, x=np.full(1000, k)), range(32)))
+
+    stored = cache.get(key)['x']
+    assert len(set(stored)) == 1
+    # No temporary files are left behind
+    assert [name for name in os.listdir(tmp_path) if name != '.lock'] == [f'{key}.npz']
+
+def test_eviction_keeps_the_most_recent_entries(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for k in range(4):
+        cache.put(cache_key(k), x=np.zeros(1000))
+        os.utime(cache.path(cache_key(k)), (k, k))
+    cache.evict(2 * os.path.getsize(cache.path(cache_key(0))))
+
+    assert [cache.get(cache_key(k)) is not None for k in range(4)] == [False, False, True, True]
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from networkmodel.calibration import CalibrationObjective, Experiment, calibrate, check_gradient
+
+NODE_NAMES = [f'n{i}' for i in range(8)]
+
+def _experiments(objective, theta):
+    # Fold-changes of every free node, observed at theta
+    log_fold_changes, _ = objective.predict(theta)
+    stimuli = [['n0'], ['n1', 'n2']]
+    return [Experiment(s, np.exp(row), np.ones(len(row))) for s, row in zip(stimuli, log_fold_changes)]
+
+def _objective(mact, minh, theta=None, **options):
+    stimuli = [Experiment(['n0'], np.ones(8), np.ones(8)), Experiment(['n1', 'n2'], np.ones(8), np.ones(8))]
+    objective = CalibrationObjective(mact, minh, NODE_NAMES, stimuli, n_samples=4, **options)
+    if theta is not None:
+        objective = CalibrationObjective(mact, minh, NODE_NAMES, _experiments(objective, theta), n_samples=4,
+                                         **options)
+    return objective
+
+@pytest.mark.parametrize('fit_edges', [False, True])
+def test_adjoint_gradient_matches_finite_differences(acyclic_network, fit_edges):
+    mact, minh = acyclic_network
+    rng = np.random.default_rng(0)
+    objective = _objective(mact, minh, fit_edges=fit_edges)
+    truth = objective.initial_parameters() + rng.normal(0, 0.3, objective.n_parameters)
+    objective = _objective(mact, minh, truth, fit_edges=fit_edges, warm_start=False)
+    theta = objective.initial_parameters()
+
+    _, grad = objective(theta)
+    assert np.max(np.abs(grad)) > 1e-3
+    assert check_gradient(objective, theta) < 1e-5 * np.max(np.abs(grad))
+    assert objective.n_unconverged == 0
+
+def test_calibrate_recovers_the_observed_fold_changes(acyclic_network):
+    mact, minh = acyclic_network
+    objective = _objective(mact, minh)
+    truth = objective.initial_parameters(gamma=np.linspace(0.6, 1.4, 8), h=8.0)
+    experiments = _experiments(objective, truth)
+
+    result = calibrate(mact, minh, NODE_NAMES, experiments, n_starts=2, n_samples=4, processes=1, max_iter=100)
+    fitted = CalibrationObjective(mact, minh, NODE_NAMES, experiments, n_samples=4)
+    initial_loss, _ = fitted(fitted.initial_parameters())
+    assert result.loss < 1e-6 * initial_loss
+    assert result.n_unconverged == 0
+    assert result.start_parameters.shape == (2, 16)
+    np.testing.assert_allclose(fitted.predict(result.start_parameters[np.argmin(result.start_losses)])[0],
+                               fitted.predict(truth)[0], atol=1e-3)
+
+def test_samples_without_a_steady_state_are_reported(inhibition_ring):
+    # Unclamped, the ring oscillates; clamping a node settles it
+    mact, minh = inhibition_ring
+    experiments = [Experiment(['a'], np.array([np.nan, 2.0, 0.5]), np.array([0.0, 1.0, 1.0]))]
+    objective = CalibrationObjective(mact, minh, ['a', 'b', 'c'], experiments, n_samples=4)
+
+    loss, grad = objective(objective.initial_parameters())
+    assert objective.n_unconverged == 4
+    assert np.isfinite(loss) and np.all(np.isfinite(grad))
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from networkmodel.continuation import continuation, parameter_sweep
+from networkmodel.mendoza import CompiledNetwork
+
+# A single self-activating node is bistable for small gamma; its upper
+# branch ends at a fold near gamma = 1.719, x = 0.448
+FOLD_GAMMA, FOLD_X = 1.719, 0.448
+
+@pytest.fixture
+def self_activation():
+    return CompiledNetwork(np.array([[1.0]]), np.array([[0.0]]), 1.0, 10.0)
+
+@pytest.mark.parametrize('settings', [{}, {'ds': 0.01, 'ds_max': 0.2}])
+def test_upper_branch_turns_at_the_fold(self_activation, settings):
+    result = continuation(self_activation, np.array([1.0]), 'gamma', 1.0, 5.0, **settings)
+
+    assert [point.kind for point in result.special_points] == ['fold']
+    fold = result.special_points[0]
+    assert fold.parameter == pytest.approx(FOLD_GAMMA, abs=0.01)
+    assert fold.x[0] == pytest.approx(FOLD_X, abs=0.01)
+    # The branch never reaches gamma = 5, and stays on the steady states
+    # between the fold and the lower branch
+    assert result.message == 'The branch left the parameter range'
+    assert result.parameter.max() < FOLD_GAMMA + 0.01
+    assert result.x.min() > 0
+    residual = [self_activation.with_parameters(gamma=np.array([p])).rhs(x) for p, x in zip(result.parameter,
+                                                                                             result.x)]
+    assert np.max(np.abs(residual)) < 1e-8
+    # Stable before the fold, unstable after it
+    assert result.stable[0] and not result.stable[-1]
+
+def test_sweep_matches_continuation(self_activation):
+    values = np.linspace(1.0, 1.6, 7)
+    sweep = parameter_sweep(self_activation, np.array([1.0]), 'gamma', values)
+
+    assert sweep.converged.all()
+    upper = continuation(self_activation, np.array([1.0]), 'gamma', 1.0, 1.6)
+    assert upper.message == 'Reached the end of the parameter range'
+    np.testing.assert_allclose(sweep.x[-1], upper.x[-1], atol=1e-8)
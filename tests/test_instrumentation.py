@@ -0,0 +1,59 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from networkmodel import instrumentation
+from networkmodel.ensemble import integrate_ensemble
+from networkmodel.mendoza import CompiledNetwork
+
+@pytest.fixture
+def recorder():
+    recorder = instrumentation.enable()
+    yield recorder
+    instrumentation.disable()
+
+def test_disabled_records_nothing(small_network):
+    instrumentation.disable()
+    assert instrumentation.active() is None
+    assert instrumentation.stage('simulate') is instrumentation.stage('other')
+    with instrumentation.stage('simulate'):
+        integrate_ensemble(CompiledNetwork(*small_network, 1.0, 10.0), np.zeros((2, 8)), 1)
+    instrumentation.report()
+
+def test_solver_statistics_and_stages(tmp_path, small_network, recorder):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    xinit = np.random.default_rng(0).random((3, network.num_of_nodes))
+    with instrumentation.stage('simulate'):
+        integrate_ensemble(network, xinit, 2)
+        integrate_ensemble(network, xinit, 2, method='BDF')
+    with instrumentation.stage('simulate'):
+        pass
+
+    assert recorder.stages['simulate']['calls'] == 2
+    assert recorder.stages['simulate']['seconds'] > 0
+    lsoda, bdf = recorder.solver_stats
+    assert lsoda['solver'] == 'LSODA' and lsoda['n_samples'] == 3 and lsoda['nfev'] > 0
+    assert bdf['solver'] == 'BDF' and bdf['nfev'] > 0
+    totals = recorder.solver_totals()
+    assert totals['LSODA']['integrations'] == 1 and totals['LSODA']['nfev'] == lsoda['nfev']
+
+    recorder.write(str(tmp_path / 'profile.json'))
+    with open(tmp_path / 'profile.json') as f:
+        profile = json.load(f)
+    assert profile['solver_totals']['BDF']['nfev'] == bdf['nfev']
+    assert profile['stages']['simulate']['calls'] == 2
+
+    recorder.write(str(tmp_path / 'profile.csv'))
+    with open(tmp_path / 'profile.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['kind'], row['name']) for row in rows] == [('stage', 'simulate'), ('solver', 'LSODA'),
+                                                            ('solver', 'BDF')]
+
+def test_odeint_stats_counts_method_switches():
+    info = {'mused': np.array([1, 1, 2, 2, 1]), 'nfe': np.array([5, 9, 20, 31, 40]),
+            'nje': np.array([0, 0, 2, 3, 3]), 'nst': np.array([3, 6, 12, 18, 22])}
+    stats = instrumentation.odeint_stats(info, n_samples=4)
+    assert stats == {'n_samples': 4, 'nfev': 40, 'njev': 3, 'nsteps': 22, 'method_switches': 2,
+                     'final_method': 'adams'}
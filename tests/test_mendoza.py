@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from networkmodel.ensemble import integrate_ensemble
+from networkmodel.mendoza import CompiledNetwork, check_jacobian, odesysfun
+from networkmodel.synthetic import scale_free_network
+
+def test_rhs_matches_odesysfun(small_network):
+    mact, minh = small_network
+    n = len(mact)
+    rng = np.random.default_rng(1)
+    gamma = rng.uniform(0.5, 1.5, n)
+    h = rng.uniform(5, 15, n)
+    clamped = np.zeros(n)
+    clamped[2] = 1
+    network = CompiledNetwork(mact, minh, gamma, h, clamped)
+    for x in rng.random((5, n)):
+        np.testing.assert_allclose(network.rhs(x), odesysfun(x, 0, n, gamma, h, mact, minh, clamped), atol=1e-12)
+
+def test_dense_jacobian_matches_finite_differences(small_network):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    for x in np.random.default_rng(2).random((5, network.num_of_nodes)):
+        assert check_jacobian(network, x) < 1e-6
+
+def test_sparse_jacobian_matches_dense():
+    mact, minh, _ = scale_free_network(40, seed=3)
+    sparse = CompiledNetwork(mact, minh, 1.0, 10.0)
+    dense = CompiledNetwork(mact.toarray(), minh.toarray(), 1.0, 10.0)
+    x = np.random.default_rng(4).random((3, 40))
+
+    assert check_jacobian(sparse, x[0]) < 1e-6
+    stacked = sparse.jacobian(x)
+    assert sp.issparse(stacked)
+    np.testing.assert_allclose(stacked.toarray(), sp.block_diag(list(dense.jacobian(x))).toarray(), atol=1e-12)
+    np.testing.assert_allclose(sparse.rhs(x), dense.rhs(x), atol=1e-12)
+
+def test_stacked_jacobian_matches_per_sample(small_network):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    x = np.random.default_rng(5).random((4, network.num_of_nodes))
+    stacked = network.jacobian(x)
+    for k in range(len(x)):
+        np.testing.assert_allclose(stacked[k], network.jacobian(x[k]))
+
+def test_banded_lsoda_agrees_with_stiff_and_sparse_solvers(small_network):
+    mact, minh = small_network
+    dense = CompiledNetwork(mact, minh, 1.0, 10.0)
+    sparse = CompiledNetwork(sp.csr_matrix(mact), sp.csr_matrix(minh), 1.0, 10.0)
+    xinit = np.random.default_rng(6).random((6, dense.num_of_nodes))
+
+    lsoda = integrate_ensemble(dense, xinit, 5)
+    bdf = integrate_ensemble(dense, xinit, 5, method='BDF', rtol=1e-8, atol=1e-10)
+    rk45 = integrate_ensemble(sparse, xinit, 5, rtol=1e-8, atol=1e-10)
+    single = np.stack([integrate_ensemble(dense, x, 5)[0] for x in xinit])
+    np.testing.assert_allclose(lsoda, single, atol=1e-6)
+    np.testing.assert_allclose(bdf, lsoda, atol=1e-5)
+    np.testing.assert_allclose(rk45, lsoda, atol=1e-5)
+
+@pytest.mark.parametrize('method', ['LSODA', 'BDF', 'Radau', 'RK45'])
+def test_every_backend_accepts_a_grid_starting_at_t0(small_network, method):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    xinit = np.random.default_rng(7).random((3, network.num_of_nodes))
+    t_eval = np.linspace(0, 5, 11)
+
+    states = integrate_ensemble(network, xinit, 5, t_eval=t_eval, method=method, rtol=1e-8, atol=1e-10)
+    assert states.shape == (11, 3, network.num_of_nodes)
+    np.testing.assert_allclose(states[0], xinit)
+    np.testing.assert_allclose(states[-1], integrate_ensemble(network, xinit, 5), atol=1e-5)
+    # A grid after t0 is returned as given
+    later = integrate_ensemble(network, xinit, 5, t_eval=t_eval[1:], method=method)
+    assert later.shape == (10, 3, network.num_of_nodes)
+
+def test_sparse_default_solver_on_a_grid_starting_at_t0():
+    mact, minh, _ = scale_free_network(200, seed=8)
+    sparse = CompiledNetwork(mact, minh, 1.0, 10.0)
+    dense = CompiledNetwork(mact.toarray(), minh.toarray(), 1.0, 10.0)
+    xinit = np.random.default_rng(9).random((2, 200))
+    t_eval = np.linspace(0, 3, 7)
+
+    states = integrate_ensemble(sparse, xinit, 3, t_eval=t_eval, rtol=1e-8, atol=1e-10)
+    assert states.shape == (7, 2, 200)
+    np.testing.assert_allclose(states[0], xinit)
+    np.testing.assert_allclose(states, integrate_ensemble(dense, xinit, 3, t_eval=t_eval), atol=1e-5)
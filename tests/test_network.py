@@ -0,0 +1,47 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from networkmodel.network import cache_filename, load_network
+
+from conftest import NETWORK_FILE
+
+def write_workbook(filename, activators, inhibitors):
+    pd.DataFrame({'Nodes': ['A', 'B', 'C'], 'Stimuli': ['A', 'B', 'C'], 'Activators': activators,
+                  'Inhibitors': inhibitors}).to_excel(filename, index=False)
+
+def test_cached_network_matches_the_workbook(tmp_path):
+    filename = str(tmp_path / 'network.xlsx')
+    shutil.copy(NETWORK_FILE, filename)
+    parsed = load_network(filename, use_cache=False)
+    first = load_network(filename)
+    assert os.path.exists(cache_filename(filename))
+    cached = load_network(filename)
+
+    for result in (first, cached):
+        np.testing.assert_array_equal(result[0], parsed[0])
+        np.testing.assert_array_equal(result[1], parsed[1])
+        assert result[2:] == parsed[2:]
+
+def test_changed_workbook_invalidates_the_cache(tmp_path):
+    filename = str(tmp_path / 'network.xlsx')
+    write_workbook(filename, ['NOTHING', 'A', 'B'], ['NOTHING', 'NOTHING', 'NOTHING'])
+    mact, minh, *_ = load_network(filename)
+    assert mact[1, 0] == 1 and not minh.any()
+
+    write_workbook(filename, ['NOTHING', 'A', 'NOTHING'], ['NOTHING', 'NOTHING', 'A,B'])
+    mact, minh, *_ = load_network(filename)
+    assert mact[2].sum() == 0
+    np.testing.assert_array_equal(minh[2], [1, 1, 0])
+
+def test_concurrent_loads_leave_one_cache(tmp_path):
+    filename = str(tmp_path / 'network.xlsx')
+    write_workbook(filename, ['NOTHING', 'A', 'B'], ['C', 'NOTHING', 'NOTHING'])
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda _: load_network(filename), range(8)))
+
+    assert all(np.array_equal(result[0], results[0][0]) for result in results)
+    assert sorted(os.listdir(tmp_path)) == ['.network.xlsx.npz', 'network.xlsx']
@@ -0,0 +1,23 @@
+import numpy as np
+
+from networkmodel.perturbations import enumerate_perturbations, perturbation_screen
+
+def test_screen_deltas_are_paired_with_the_baseline(acyclic_network):
+    mact, minh = acyclic_network
+    n = len(mact)
+    xinit = np.random.default_rng(0).random((4, n))
+    perturbations = enumerate_perturbations(n)[:4]
+    result = perturbation_screen(mact, minh, 1.0, 10.0, perturbations, xinit, processes=1)
+
+    assert result.deltas.shape == (4, 4, n)
+    assert result.converged.all()
+    node, level = perturbations[0][0]
+    np.testing.assert_allclose(result.baseline[:, node] + result.deltas[0, :, node], level)
+
+def test_unconverged_samples_are_masked(inhibition_ring):
+    mact, minh = inhibition_ring
+    xinit = np.random.default_rng(1).random((3, 3))
+    result = perturbation_screen(mact, minh, 1.0, 10.0, [((0, 1),)], xinit, processes=1)
+
+    assert not result.converged[0].any()
+    assert np.isnan(result.deltas).all()
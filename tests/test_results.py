@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('h5py')
+
+from networkmodel.results import ResultReader, ResultWriter, export_summary_excel
+
+NODE_NAMES = ['a', 'b', 'c']
+
+def test_round_trip_and_chunked_summary(tmp_path):
+    filename = str(tmp_path / 'results.h5')
+    rng = np.random.default_rng(0)
+    final = rng.random((50, 3))
+    trajectories = rng.random((50, 4, 3))
+    clamped = (rng.random((50, 3)) < 0.3).astype(float)
+
+    # Small chunks so the summary merges many blocks
+    with ResultWriter(filename, NODE_NAMES, parameters={'h': np.float64(10.0), 'gamma': np.ones(3)},
+                      clamped=[0, 0, 1], time_points=np.arange(4), chunk_rows=8) as writer:
+        writer.append_final(final[0])
+        writer.append_final(final[1:], clamped[1:])
+        for trajectory in np.array_split(trajectories, 3):
+            writer.append_trajectories(trajectory)
+
+    with ResultReader(filename) as reader:
+        assert reader.node_names == NODE_NAMES
+        assert reader.parameters == {'h': 10.0, 'gamma': [1.0, 1.0, 1.0]}
+        np.testing.assert_array_equal(reader.clamped, [0, 0, 1])
+        np.testing.assert_array_equal(reader.time_points, np.arange(4))
+        np.testing.assert_array_equal(reader['final'][:], final)
+        np.testing.assert_array_equal(reader['clamped'][:], clamped[1:])
+        np.testing.assert_array_equal(reader['trajectories'][:], trajectories)
+        assert len(list(reader.iter_chunks())) > 1
+
+        summary = reader.summary(max_bytes=8)
+        assert summary['count'] == 50
+        np.testing.assert_allclose(summary['mean'], final.mean(axis=0))
+        np.testing.assert_allclose(summary['median'], np.median(final, axis=0))
+        np.testing.assert_allclose(summary['std'], final.std(axis=0))
+        at_time = reader.summary('trajectories', time_index=1)
+        np.testing.assert_allclose(at_time['mean'], trajectories[:, 1].mean(axis=0))
+        np.testing.assert_allclose(at_time['median'], np.median(trajectories[:, 1], axis=0))
+
+def test_export_summary_excel(tmp_path):
+    pd = pytest.importorskip('pandas')
+    pytest.importorskip('openpyxl')
+    filename = str(tmp_path / 'results.h5')
+    final = np.random.default_rng(1).random((10, 3))
+    with ResultWriter(filename, NODE_NAMES) as writer:
+        writer.append_final(final)
+
+    with ResultReader(filename) as reader:
+        export_summary_excel(reader, str(tmp_path / 'summary.xlsx'))
+    table = pd.read_excel(tmp_path / 'summary.xlsx', index_col=0)
+    assert list(table.columns) == NODE_NAMES
+    np.testing.assert_allclose(table.loc['mean'], final.mean(axis=0))
+    np.testing.assert_allclose(table.loc['std'], final.std(axis=0))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('libsbml')
+pytest.importorskip('roadrunner')
+
+from networkmodel.cache import ResultCache
+from networkmodel.ensemble import integrate_ensemble
+from networkmodel.mendoza import CompiledNetwork
+from networkmodel.rrensemble import RoadRunnerEnsemble
+from networkmodel.sbmlgenerator import export_to_sbml_with_params
+
+@pytest.fixture
+def exported(tmp_path, small_network):
+    mact, minh = small_network
+    n = len(mact)
+    node_names = [f'node{k}' for k in range(n)]
+    filename = str(tmp_path / 'network.xml')
+    export_to_sbml_with_params(filename, node_names, mact, minh, np.zeros(n), np.zeros(n), 1.0, 10.0)
+    return filename, node_names, CompiledNetwork(mact, minh, 1.0, 10.0)
+
+def test_run_matches_integrate_ensemble_with_clamps(exported):
+    filename, node_names, network = exported
+    ensemble = RoadRunnerEnsemble(filename, species_ids=node_names)
+    xinit = np.random.default_rng(0).random((4, len(node_names)))
+    clamped = np.zeros((4, len(node_names)))
+    clamped[1, 2] = clamped[3, [0, 5]] = 1
+
+    final = ensemble.run(xinit, clamped, t_end=5)
+    network.set_clamped(clamped)
+    expected = integrate_ensemble(network, xinit, 5, rtol=1e-10, atol=1e-10)
+    np.testing.assert_allclose(final, expected, atol=1e-5)
+    np.testing.assert_allclose(final[clamped == 1], xinit[clamped == 1])
+
+    # Samples do not leak clamps or states into each other
+    np.testing.assert_allclose(ensemble.run(xinit[:1], t_end=5), final[:1], atol=1e-8)
+    trajectories = ensemble.run(xinit, clamped, t_end=5, num_points=11, final_only=False)
+    assert trajectories.shape == (4, 11, len(node_names))
+    np.testing.assert_allclose(trajectories[:, 0], xinit)
+    np.testing.assert_allclose(trajectories[:, -1], final, atol=1e-8)
+
+def test_state_file_and_cache(tmp_path, exported):
+    filename, node_names, _ = exported
+    state_file = str(tmp_path / 'network.rrstate')
+    xinit = np.random.default_rng(1).random((2, len(node_names)))
+    expected = RoadRunnerEnsemble(filename, node_names, state_file).run(xinit, t_end=2)
+
+    restored = RoadRunnerEnsemble(filename, node_names, state_file)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    np.testing.assert_allclose(restored.run(xinit, t_end=2, cache=cache), expected, atol=1e-8)
+    np.testing.assert_array_equal(restored.run(xinit, t_end=2, cache=cache), restored.run(xinit, t_end=2, cache=cache))
+
+def test_missing_clamp_parameter_is_rejected(tmp_path, small_network):
+    mact, minh = small_network
+    n = len(mact)
+    node_names = [f'node{k}' for k in range(n)]
+    filename = str(tmp_path / 'reactions.xml')
+    export_to_sbml_with_params(filename, node_names, mact, minh, np.zeros(n), np.zeros(n), 1.0, 10.0,
+                               mode='reactions')
+    clamped = np.zeros(n)
+    clamped[0] = 1
+    with pytest.raises(ValueError, match='clamp parameter'):
+        RoadRunnerEnsemble(filename, node_names).run(np.zeros(n), clamped)
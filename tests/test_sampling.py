@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from networkmodel.mendoza import CompiledNetwork
+from networkmodel.sampling import RunningStatistics, adaptive_ensemble
+
+def test_running_statistics_match_numpy():
+    samples = np.random.default_rng(0).random((100, 3))
+    stats = RunningStatistics(3)
+    for batch in np.split(samples, [10, 37, 64]):
+        stats.update(batch)
+
+    np.testing.assert_allclose(stats.mean, samples.mean(axis=0))
+    np.testing.assert_allclose(stats.std, samples.std(axis=0, ddof=1))
+    np.testing.assert_allclose(stats.median, np.median(samples, axis=0))
+
+def test_sobol_batches_are_powers_of_two(acyclic_network):
+    network = CompiledNetwork(*acyclic_network, 1.0, 10.0)
+    result = adaptive_ensemble(network, tol=1e-12, seed=0, min_samples=3, max_samples=100)
+
+    # 4, then 4 more, 8, 16 and 32; 128 would exceed max_samples
+    assert result.n_samples == 64
+    assert result.n_unconverged == 0
+    assert not result.converged
+
+def test_unconverged_samples_are_counted(inhibition_ring):
+    network = CompiledNetwork(*inhibition_ring, 1.0, 10.0)
+    result = adaptive_ensemble(network, sampler='random', seed=0, batch_size=4, min_samples=4, max_samples=8)
+
+    assert result.n_samples == 0
+    assert result.n_unconverged == 8
+    assert result.x.shape == (0, 3)
+
+@pytest.mark.parametrize('min_samples, max_samples', [(64, 0), (0, 10), (10, 5)])
+def test_sample_counts_are_validated(small_network, min_samples, max_samples):
+    network = CompiledNetwork(*small_network, 1.0, 10.0)
+    with pytest.raises(ValueError):
+        adaptive_ensemble(network, min_samples=min_samples, max_samples=max_samples)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+libsbml = pytest.importorskip('libsbml')
+roadrunner = pytest.importorskip('roadrunner')
+
+from scipy.integrate import odeint
+
+from networkmodel.mendoza import odesysfun
+from networkmodel.network import load_network
+from networkmodel.sbmlgenerator import export_to_sbml_with_params, sanitize_id
+
+from conftest import NETWORK_FILE
+
+@pytest.fixture
+def stimulated():
+    mact, minh, node_names, num_of_nodes, _ = load_network(NETWORK_FILE)
+    xinit = np.random.default_rng(0).random(num_of_nodes)
+    clamped = np.zeros(num_of_nodes)
+    clamped[node_names.index('IL-1β')] = 1
+    xinit[clamped == 1] = 1
+    return mact, minh, node_names, xinit, clamped
+
+def _simulate(filename, node_names, times):
+    rr = roadrunner.RoadRunner(filename)
+    rr.timeCourseSelections = ['time'] + [f'[{sanitize_id(name)}]' for name in node_names]
+    rr.integrator.relative_tolerance = 1e-10
+    rr.integrator.absolute_tolerance = 1e-12
+    return np.array(rr.simulate(times[0], times[-1], len(times)))[:, 1:]
+
+def _rates_of_change(filename, node_names, x):
+    # The rules as a simulator evaluates them from the file, in node order
+    rr = roadrunner.RoadRunner(filename)
+    node_ids = [sanitize_id(name) for name in node_names]
+    for node_id, value in zip(node_ids, x):
+        rr[f'[{node_id}]'] = value
+    rates = dict(zip(rr.model.getRateRuleSymbols(), rr.getRatesOfChange()))
+    return np.array([rates[node_id] for node_id in node_ids])
+
+def test_rate_rules_reproduce_odesysfun(tmp_path, stimulated):
+    mact, minh, node_names, xinit, clamped = stimulated
+    n = len(node_names)
+    rng = np.random.default_rng(1)
+    gamma = rng.uniform(0.5, 1.5, n)
+    h = rng.uniform(5, 15, n)
+    filename = str(tmp_path / 'rate_rules.xml')
+    export_to_sbml_with_params(filename, node_names, mact, minh, xinit, clamped, gamma, h)
+
+    model = libsbml.readSBMLFromFile(filename).getModel()
+    assert model.getNumReactions() == 0
+    assert sum(rule.isRate() for rule in model.getListOfRules()) == n
+    for x in [xinit] + list(rng.random((3, n))):
+        np.testing.assert_allclose(_rates_of_change(filename, node_names, x),
+                                   odesysfun(x, 0, n, gamma, h, mact, minh, clamped), atol=1e-12)
+
+    times = np.linspace(0, 10, 11)
+    expected = odeint(odesysfun, xinit, times, args=(n, gamma, h, mact, minh, clamped), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(_simulate(filename, node_names, times), expected, atol=1e-6)
+
+def test_reaction_mode_keeps_one_reaction_per_edge(tmp_path, stimulated):
+    # The legacy export is not the Mendoza equation, so only its structure is checked
+    mact, minh, node_names, xinit, clamped = stimulated
+    filename = str(tmp_path / 'reactions.xml')
+    export_to_sbml_with_params(filename, node_names, mact, minh, xinit, clamped, 1.0, 10.0, mode='reactions')
+
+    model = libsbml.readSBMLFromFile(filename).getModel()
+    assert model.getNumReactions() == int(np.count_nonzero(mact) + np.count_nonzero(minh))
+    assert model.getNumRules() == 0
+    assert np.all(np.isfinite(_simulate(filename, node_names, np.linspace(0, 1, 3))))
@@ -0,0 +1,65 @@
+import numpy as np
+
+from networkmodel.mendoza import CompiledNetwork
+from networkmodel.sensitivity import (evaluate_design, morris_design, morris_indices, parameter_bounds,
+                                      saltelli_design, scale_design, sobol_analysis, sobol_indices)
+from networkmodel.steadystate import newton_polish, steady_state
+
+def test_sobol_indices_of_an_additive_model():
+    # Y = X1 + 2 X2 on the unit square: S1 = 1/5, S2 = 4/5, no interactions
+    design = saltelli_design(2, 4096, seed=0)
+    outputs = (design[:, 0] + 2 * design[:, 1])[:, None]
+    first, total = sobol_indices(outputs, 2)
+    np.testing.assert_allclose(first[:, 0], [0.2, 0.8], atol=0.03)
+    np.testing.assert_allclose(total[:, 0], [0.2, 0.8], atol=0.03)
+
+def test_sobol_indices_drop_unconverged_samples_and_noise_outputs():
+    design = saltelli_design(2, 1024, seed=1)
+    noise = 1e-9 * np.random.default_rng(0).standard_normal(len(design))
+    outputs = np.column_stack((design[:, 0] + 2 * design[:, 1], noise))
+    reference, _ = sobol_indices(outputs, 2)
+    outputs[5] = np.nan
+
+    first, total = sobol_indices(outputs, 2, min_variance=1e-12)
+    assert np.all(np.isfinite(first)) and np.all(np.isfinite(total))
+    np.testing.assert_allclose(first[:, 0], reference[:, 0], atol=0.02)
+    assert np.all(first[:, 1] == 0) and np.all(total[:, 1] == 0)
+
+def test_morris_indices_skip_trajectories_with_nan():
+    design, order, steps = morris_design(3, 10, seed=0)
+    outputs = (design @ np.array([1.0, -2.0, 0.0]))[:, None]
+    outputs[4] = np.nan
+    mu, mu_star, sigma = morris_indices(outputs, order, steps)
+    np.testing.assert_allclose(mu[:, 0], [1, -2, 0], atol=1e-12)
+    np.testing.assert_allclose(mu_star[:, 0], [1, 2, 0], atol=1e-12)
+
+def test_evaluate_design_flags_rows_that_did_not_settle(inhibition_ring):
+    # The acyclic chain settles
+    chain = np.eye(3, k=-1)
+    xinit = np.random.default_rng(2).random((2, 3))
+    parameters = scale_design(np.full((2, 6), 0.5), parameter_bounds(3))
+    assert np.isnan(evaluate_design(*inhibition_ring, parameters, xinit, processes=1)).all()
+    assert np.isfinite(evaluate_design(chain, np.zeros((3, 3)), parameters, xinit, processes=1)).all()
+
+def test_sobol_analysis_flags_constant_outputs():
+    # Node 0 is clamped at 1 and drives nodes 1 and 2 through an activating
+    # chain, so they depend on their own gamma and h
+    chain = np.eye(3, k=-1)
+    clamped = np.array([1.0, 0, 0])
+    xinit = np.random.default_rng(3).random((2, 3))
+    xinit[:, 0] = 1
+    result = sobol_analysis(chain, np.zeros((3, 3)), ['a', 'b', 'c'], xinit, n_base=8, clamped=clamped, seed=0,
+                            processes=1)
+
+    assert result.constant.tolist() == [True, False, False]
+    assert np.all(result.first_order[:, 0] == 0)
+    assert np.any(result.total_order[:, 1:] > 0)
+
+def test_newton_polish_reaches_machine_precision(acyclic_network):
+    network = CompiledNetwork(*acyclic_network, 1.0, 10.0)
+    xinit = np.random.default_rng(4).random((4, network.num_of_nodes))
+    result = steady_state(network, xinit, tol=1e-4)
+    polished = newton_polish(network, result.x)
+
+    assert np.max(np.abs(network.rhs(polished))) < 1e-12
+    np.testing.assert_allclose(polished, steady_state(network, xinit, tol=1e-12).x, atol=1e-9)
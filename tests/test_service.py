@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from networkmodel.service import QueryError, SimulationService
+
+@pytest.fixture
+def service(acyclic_network):
+    mact, minh = acyclic_network
+    return SimulationService(mact, minh, [f'n{i}' for i in range(len(mact))], n_samples=4)
+
+def test_parse_query_applies_clamps_and_overrides(service):
+    (clamp, gamma, h, t_end), key = service.parse_query({'clamp': {'n1': 1}, 'gamma': 2, 'h': {'n0': 8}})
+
+    assert clamp[1] == 1 and np.isnan(np.delete(clamp, 1)).all()
+    np.testing.assert_array_equal(gamma, 2.0)
+    assert h[0] == 8 and (h[1:] == 10).all()
+    assert t_end is None
+    assert service.parse_query({'h': {'n0': 8}, 'clamp': {'n1': 1.0}, 'gamma': 2.0})[1] == key
+
+@pytest.mark.parametrize('query', [
+    {'clamp': {'n1': True}},
+    {'clamp': {'n1': 2}},
+    {'clamp': {'nx': 1}},
+    {'clamp': ['n1']},
+    {'gamma': True},
+    {'h': {'n0': False}},
+    {'h': -1},
+    {'gamma': float('nan')},
+    {'t_end': True},
+    {'t_end': 0},
+    {'seed': 1},
+    [],
+])
+def test_parse_query_rejects_invalid_queries(service, query):
+    with pytest.raises(QueryError):
+        service.parse_query(query)
+
+def test_solve_holds_clamped_nodes(service):
+    spec, _ = service.parse_query({'clamp': {'n0': 0.25}})
+    result, = service.solve([spec])
+
+    assert result['converged']
+    assert result['mean'][0] == pytest.approx(0.25)
+    assert result['samples'] == 4
+
+def test_solve_splits_per_sample_parameters_over_chunks(acyclic_network):
+    # 33 queries of 32 samples stack more than integrate_ensemble's 1000-sample chunks
+    mact, minh = acyclic_network
+    service = SimulationService(mact, minh, [f'n{i}' for i in range(len(mact))], n_samples=32)
+    levels = np.linspace(0, 1, 33)
+    specs = [service.parse_query({'clamp': {'n0': level}, 'h': 5 + 10 * level, 't_end': 2})[0] for level in levels]
+    results = service.solve(specs)
+
+    assert len(results) == 33
+    for k in (0, 16, 32):
+        alone, = service.solve([specs[k]])
+        assert results[k]['mean'][0] == pytest.approx(levels[k])
+        np.testing.assert_allclose(results[k]['mean'], alone['mean'], atol=1e-6)
+
+def test_query_that_never_settles_does_not_hold_the_batch(inhibition_ring):
+    mact, minh = inhibition_ring
+    service = SimulationService(mact, minh, ['a', 'b', 'c'], n_samples=4, t_first=5, t_max=50)
+    specs = [service.parse_query(query)[0] for query in ({'clamp': {'a': 1}}, {})]
+    clamped, ring = service.solve(specs)
+
+    assert clamped['converged'] and clamped['mean'][0] == 1
+    assert not ring['converged']
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from networkmodel.mendoza import CompiledNetwork
+from networkmodel.steadystate import steady_state
+
+@pytest.mark.parametrize('method', ['event', 'root'])
+def test_steady_states_have_small_residuals(acyclic_network, method):
+    network = CompiledNetwork(*acyclic_network, 1.0, 10.0)
+    xinit = np.random.default_rng(0).random((5, network.num_of_nodes))
+    result = steady_state(network, xinit, method=method, tol=1e-8)
+
+    assert result.converged.all()
+    assert np.all(result.residual <= 1e-8 * (1 + 1e-6))
+    np.testing.assert_allclose(np.max(np.abs(network.rhs(result.x)), axis=1), result.residual)
+
+def test_event_and_root_strategies_agree(acyclic_network):
+    clamped = np.zeros(len(acyclic_network[0]))
+    clamped[0] = 1
+    network = CompiledNetwork(*acyclic_network, 1.0, 10.0, clamped)
+    xinit = np.random.default_rng(1).random((4, network.num_of_nodes))
+    xinit[:, 0] = 1
+
+    event = steady_state(network, xinit, tol=1e-9)
+    root = steady_state(network, xinit, method='root', tol=1e-9)
+    np.testing.assert_allclose(event.x, root.x, atol=1e-6)
+    assert np.all(event.x[:, 0] == 1)
+
+def test_single_sample_and_oscillating_network(inhibition_ring):
+    network = CompiledNetwork(*inhibition_ring, 1.0, 10.0)
+    result = steady_state(network, np.array([0.9, 0.1, 0.5]), t_max=200)
+
+    assert result.x.shape == (3,)
+    assert not result.converged
+    assert result.residual > 1e-6
+
+def test_unknown_method(small_network):
+    with pytest.raises(ValueError):
+        steady_state(CompiledNetwork(*small_network, 1.0, 10.0), np.zeros(8), method='newton')